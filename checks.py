@@ -0,0 +1,452 @@
+"""The Data Issues checks of the CFSA and FSMS dashboards, declared once.
+
+Each Check flags households through a predicate over the columns of the
+processed dataset and of ``add_check_columns``; ``evaluate`` runs every
+predicate over the same NumPy columns into a FlagMatrix, one boolean column per
+check, which the Data Issues tab then only reads. Large datasets are evaluated
+in blocks of rows on a thread pool, as NumPy releases the GIL for the
+comparisons.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from survey_columns import (CHILDREN_24MONTHS_17_YEARS_COLUMNS, EXPENDITURE_EDUCATION_COLUMNS,
+                            EXPENDITURE_FOOD_ITEMS_COLUMNS, FOOD_CON_7DAYS_COLUMNS, FOOD_CON_24HRS_COLUMNS,
+                            FOOD_GROUPS, LIVELIHOOD_COLUMNS, RENAME_COLUMNS)
+
+# Threads evaluating the checks, and the fewest rows worth a thread of their own
+CHECK_WORKERS = int(os.environ.get("QC_CHECK_WORKERS", os.cpu_count() or 1))
+MIN_BLOCK_ROWS = 16384
+
+ERROR = "error"      # answers that contradict each other
+WARNING = "warning"  # answers that are possible but unlikely enough to verify
+
+# Weight of a failed check in a household's issue score, by severity
+SEVERITY_WEIGHTS = {ERROR: 3, WARNING: 1}
+
+# SDG per USD
+OFFICIAL_RATE = 1987
+MARKET_RATE = 2350
+
+# Minimum expenditure basket per state, in USD
+STATE_MEB_USD = {
+    "AL Gazira": 508,
+    "Blue Nile": 473,
+    "Central Darfur": 519,
+    "East Darfur": 519,
+    "Gadarif": 344,
+    "Kassala": 304,
+    "Khartoum": 370,
+    "River Nile": 356,
+    "North Darfur": 415,
+    "North Kordofan": 567,
+    "AL Shimalia": 465,
+    "Red Sea": 384,
+    "Sinnar": 327,
+    "South Darfur": 385,
+    "South Kordofan": 567,
+    "West Darfur": 294,
+    "West Kordofan": 380,
+    "White nile": 444
+}
+
+
+def add_row_columns(df, survey):
+    """Add the check columns of ``add_check_columns`` that each household's
+    own answers determine, to ``df`` (or a chunk of it) in place."""
+    df['expenditure_food_items'] = df[EXPENDITURE_FOOD_ITEMS_COLUMNS].sum(axis=1)
+    df['expenditure_education'] = df[EXPENDITURE_EDUCATION_COLUMNS].sum(axis=1)
+    df['children_24months_17_years_sum'] = df[CHILDREN_24MONTHS_17_YEARS_COLUMNS[survey]].sum(axis=1)
+    df['current_live_Income_Total'] = df[[RENAME_COLUMNS[column] for column in LIVELIHOOD_COLUMNS]].sum(axis=1)
+
+    df['expenditure_food_items_offi_usd'] = df['expenditure_food_items'] / OFFICIAL_RATE
+    df['expenditure_food_items_oth_market_usd'] = df['expenditure_food_items'] / MARKET_RATE
+    df['per_capita_expenditure_food_items_offi_usd'] = df['expenditure_food_items_offi_usd'] / df['hh_size']
+    df['per_capita_expenditure_food_items_oth_market_usd'] = df['expenditure_food_items_oth_market_usd'] / df['hh_size']
+
+    df['meb_un_rate_usd'] = df['QState'].map(STATE_MEB_USD).astype(float)
+    return df
+
+
+def add_check_columns(df, survey):
+    """Add the totals and rates the checks (and the statistics around them on
+    the Data Issues tab) are stated in, to ``df`` in place."""
+    add_row_columns(df, survey)
+
+    # High: above the 75th percentile of the households with poor FCS
+    poor = df['fcs_categories_labels'] == 'Poor'
+    threshold = df.loc[poor, 'expenditure_food_items_oth_market_usd'].quantile(0.75)
+    df['high_spending_poor'] = poor & (df['expenditure_food_items_oth_market_usd'] > threshold)
+    return df
+
+
+@dataclass(frozen=True, eq=False)
+class Check:
+    """One Data Issues check: the households ``predicate(columns)`` flags,
+    where ``columns`` maps column names to NumPy arrays (and
+    ``columns.derived(function)`` is ``function(columns)``, computed once for
+    all checks). Predicates compare rows one by one (thresholds over the whole
+    dataset belong in ``add_check_columns``), so they can be given any block
+    of rows.
+
+    ``number`` places it on the tab, ``sheet_name`` and ``file_name`` name
+    its export and ``label`` describes it on the download button; ``note``
+    (with a ``{count}`` field) is shown under it when it flags anything.
+    ``row_wise`` is False for checks that read a column of
+    ``add_check_columns`` computed over the whole dataset, which a chunk of
+    it (see ``streaming``) does not give.
+    """
+    id: str
+    number: int
+    description: str
+    predicate: object
+    sheet_name: str
+    file_name: str
+    label: str
+    severity: str = WARNING
+    note: str = None
+    row_wise: bool = True
+
+
+def consumption_violations(columns):
+    """The two 7-day/24-hour contradictions, for every food group at once:
+    (rows, ``FOOD_GROUPS``) boolean matrices of the households that ate the
+    group in the last 24 hours but on none of the last 7 days (or did not
+    answer), and of those that ate it on all 7 days but not in the last 24
+    hours."""
+    days = columns.matrix(FOOD_CON_7DAYS_COLUMNS)
+    yesterday = columns.matrix(FOOD_CON_24HRS_COLUMNS)
+    not_in_days = days == 0
+    if days.dtype.kind == "f":
+        not_in_days |= np.isnan(days)
+    return (yesterday == 1) & not_in_days, (yesterday == 0) & (days == 7)
+
+
+@dataclass(frozen=True, eq=False)
+class FoodConsistency:
+    """``consumption_violations`` of a frame, per household (rows) and food
+    group (columns)."""
+    not_in_7days: pd.DataFrame
+    not_in_24hrs: pd.DataFrame
+
+    def rates(self, by):
+        """Percentage of households with each contradiction, per food group
+        and per value of ``by`` (columns of the frame, e.g. ``[df["QState"],
+        df["Enumerator"]]``): the tables of the 24-hours-only and 7-days-only
+        cases."""
+        return tuple(violations.groupby(by, observed=True).mean() * 100
+                     for violations in (self.not_in_7days, self.not_in_24hrs))
+
+
+def food_consistency(df):
+    """The FoodConsistency of the households of ``df``."""
+    not_in_7days, not_in_24hrs = consumption_violations(_Columns(_Arrays(df), slice(None)))
+    return FoodConsistency(pd.DataFrame(not_in_7days, index=df.index, columns=FOOD_GROUPS),
+                           pd.DataFrame(not_in_24hrs, index=df.index, columns=FOOD_GROUPS))
+
+
+# (food group, name in the descriptions, export sheet name), in the order of the tab
+_FOOD_GROUP_CHECKS = [
+    ("Q5_1", "cereals", "Cereal Consumption"),
+    ("Q5_2", "pulses", "Pulses Consumption"),
+    ("Q5_3", "Milk", "Milk Consumption"),
+    ("Q5_4", "Meat, fish and eggs", "Meat Fish Eggs"),
+    ("Q5_4_1", "Flesh meat", "Flesh Meat"),
+    ("Q5_4_2", "Organ meat", "Organ Meat"),
+    ("Q5_4_3", "Fish/shellfish", "Fish Shellfish"),
+    ("Q5_4_4", "Eggs", "Eggs"),
+    ("Q5_5", "Vegetables and leaves", "Vegetables and Leaves"),
+    ("Q5_5_1", "Orange vegetables", "Orange Vegetables"),
+    ("Q5_5_2", "Green leafy vegetables", "Green Leafy Vegetables"),
+    ("Q5_6_1", "Orange fruits", "Orange Fruits"),
+    ("Q5_6", "fruits", "Fruits"),
+    ("Q5_7", "oil-fats", "Oil-Fats"),
+    ("Q5_8", "sugar", "Sugar"),
+    ("Q5_9", "condiments", "Condiments"),
+]
+
+# Names of the food groups, as in the check descriptions
+FOOD_GROUP_NAMES = {group: name for group, name, _ in _FOOD_GROUP_CHECKS}
+
+
+def _food_group_checks(first_number):
+    # Two checks per group, reading the columns of consumption_violations
+    checks = []
+    for offset, (group, name, sheet_name) in enumerate(_FOOD_GROUP_CHECKS):
+        column = FOOD_GROUPS.index(group)
+        number = first_number + 2 * offset
+        checks.append(Check(
+            f"{group}_24hrs_not_7days", number,
+            f"Records indicating no consumption of {name} in the last 7 days but consumed in the last 24hrs",
+            lambda c, column=column: c.derived(consumption_violations)[0][:, column],
+            sheet_name, f"filtered_data_{group}.xlsx", name, ERROR))
+        checks.append(Check(
+            f"{group}_7days_not_24hrs", number + 1,
+            f"Records indicating no consumption of {name} in the last 24 hours but consumed all day (7 days) "
+            f"in the last one week",
+            lambda c, column=column: c.derived(consumption_violations)[1][:, column],
+            sheet_name, f"filtered_data_{group}_7days_not_24hrs.xlsx",
+            f"{name} consumed all days last 7 days but not consumed in the last 24hrs"))
+    return checks
+
+
+CHECKS = (
+    Check("zero_food_spending", 1, "Records indicating zero spending on food items",
+          lambda c: c['expenditure_food_items'] == 0,
+          'Zero Spending Records', "expenditure_food_items_too_low_zero.xlsx", "Zero spending on food"),
+    Check("education_without_children", 2,
+          "Records indicating expenditure on education greater than 0 but no children of age 24 months to 17 years",
+          lambda c: (c['expenditure_education'] > 0) & (c['children_24months_17_years_sum'] == 0),
+          'Expenditure Data', "expenditure_education_gt_0_no_child.xlsx",
+          "expenditure on education is greater than 0 but no child between 2 to 17 years"),
+    Check("income_total", 3,
+          "Records indicating invalid total income proportions from current livelihood activities",
+          lambda c: c['current_live_Income_Total'] != 100,
+          'Invalid Income Totals', "invalid_current_live_Income_Total.xlsx", "invalid income totals", ERROR),
+    Check("no_food_7days", 4, "Records indicating no consumption of any food item in the last 7 days",
+          lambda c: c['food_con_7days_sum'] == 0,
+          'No Food Consumption', "food_con_7days_sum_zero.xlsx",
+          "HHs with no consumption of any food item in the last 7 days", ERROR),
+    *_food_group_checks(5),
+    Check("very_low_fcs", 37, "Records indicating very low FCS (less than 10 which is considered very rare)",
+          lambda c: c['fcs'] < 10,
+          'Very Low FCS', "very_low_fcs.xlsx", "of very low FCS - less than 10",
+          note="Check the {count} records across other columns such as expenditure, main livelihoods, "
+               "HH size, etc. Do they make sense?"),
+    Check("high_spending_poor_fcs", 41,
+          "We do not expect households spending very high income on food to still have poor to borderline FCS. "
+          "We therefore need to flag such cases",
+          lambda c: c['high_spending_poor'],
+          'Flagged Records', "flagged_records.xlsx", "of poor-borderline FCS - but high spending",
+          row_wise=False),
+    Check("high_food_expenditure", 43, "Records indicating HHs spending more than 500USD on food items - considered high",
+          lambda c: c['expenditure_food_items_oth_market_usd'] > 500,
+          'High Food Expenditure', "filtered_data_high_exp.xlsx", "greater than 500USD spending"),
+    Check("high_per_capita_expenditure", 44,
+          "Records indicating per capita spending more than 80 USD on food items - considered high",
+          lambda c: c['per_capita_expenditure_food_items_oth_market_usd'] > 80,
+          'High Per Capita Expenditure', "filtered_data_high_percap_exp.xlsx",
+          "greater than 80 USD spending per capita"),
+    Check("high_hh_low_per_capita_expenditure", 45,
+          "Records indicating per capita spending less than 80 USD on food items but HH spending greater than "
+          "500USD - considered high",
+          lambda c: (c['per_capita_expenditure_food_items_oth_market_usd'] < 80)
+                    & (c['expenditure_food_items_oth_market_usd'] > 500),
+          'High HH vs Low Per Capita', "filtered_data_high_hh_percap_exp.xlsx",
+          "less than 80 USD per capita but HH spending greater than 500 USD"),
+    Check("low_food_expenditure", 46, "Records indicating HHs spending less than 15 USD on food items - considered low",
+          lambda c: c['expenditure_food_items_oth_market_usd'] < 15,
+          'Low Food Expenditure', "filtered_data_low_exp.xlsx", "less than 15 USD spending"),
+    Check("fcs_acc_hhs_sev", 47,
+          "Records indicating HHs having acceptable FCS but severe HHS; A strong correlation isn't systematically "
+          "observed between FCS and HHS but a postive relation could be observed",
+          lambda c: (c['fcs'] > 42) & (c['HHS'] > 4),
+          'fcs_acc_hhs_sev', "filtered_data_fcs_acc_hhs_sev.xlsx", "fcs acceptable but severe hhs"),
+    Check("fcs_acc_rcsi_high", 48,
+          "Records indicating HHs having acceptable FCS but high rCSI (rcsi gt 18); Any HH that would have an "
+          "acceptable FCS score (higher scores) and a high rCSI score is most likely indicative of data quality "
+          "issue with one or both indicators",
+          lambda c: (c['fcs'] > 42) & (c['rCSI'] > 18),
+          'fcs_acc_rcsi_high', "filtered_data_fcs_acc_rcsi_high.xlsx", "fcs acceptable but rcsi high(gt 18)"),
+    Check("fcs_acc_rcsi_low_hhs_mod_sev", 49,
+          "Records indicating HHs having acceptable FCS, low rCSI but moderate/severe HHS; FCS score, rCSI score "
+          "and HHS score about 6 combinations would indicate non logical situation where FCS score is acceptable "
+          "and rCSI is low but HHS score is moderate to very severe.",
+          lambda c: (c['fcs'] > 42) & (c['rCSI'] < 4) & (c['HHS'] > 3),
+          'fcs_acc_rcsi_low_hhs_mod_sev', "filtered_data_fcs_acc_rcsi_low_hhs_mod_sev.xlsx",
+          "fcs acceptable, rcsi low but moderate/severe hhs"),
+    Check("fc_cereals_tubers_con_low", 51,
+          "Records indicating HHs having low frequency (less than 4 days) of cereal and tubers consumption",
+          lambda c: c['Q5_1a'] < 4,
+          'fc_cereals_tubers_con_low', "filtered_data_fc_cereals_tubers_con_low.xlsx",
+          "low cereal and tubers consumption"),
+    Check("food_exp_gt_meb_fcs_pr_bln", 52,
+          "Records indicating HHs having food expenditure greater than MEB but having poor to borderline",
+          lambda c: (c['fcs'] < 42.5) & (c['expenditure_food_items_oth_market_usd'] > c['meb_un_rate_usd']),
+          'food_exp_gt_meb_fcs_pr_bln', "filtered_data_food_exp_gt_meb_fcs_pr_bln.xlsx",
+          "greater than MEB spending on food but poor to borderline fcs"),
+    Check("hhs_q10_q3gt_0", 53,
+          "Records indicating HHs Go a whole day and night without eating but did not indicate that there was a "
+          "day when there was No food of any kind in the house",
+          lambda c: (c['HHSQ3'] > 0) & (c['HHSQ1'] == 0),
+          'hhs_q10_q3gt_0', "filtered_data_hhs_q10_q3gt_0.xlsx", "hhs_q3_gt 0 but hhs_q1_0", ERROR),
+    Check("hhs_q20_q3gt_0", 54,
+          "Records indicating HHs Go a whole day and night without eating but did not indicate that they Go to "
+          "sleep hungry because there was not enough food",
+          lambda c: (c['HHSQ3'] > 0) & (c['HHSQ2'] == 0),
+          'hhs_q20_q3gt_0', "filtered_data_hhs_q20_q3gt_0.xlsx", "hhs_q3_gt 0 but hhs_q2_0", ERROR),
+    Check("hhs_q10_q20_q3gt_0", 55,
+          "Records indicating HHs Go a whole day and night without eating but did not indicate that they Go to "
+          "sleep hungry because there was not enough food, neither did they indicate that there was No food of "
+          "any kind in the house",
+          lambda c: (c['HHSQ3'] > 0) & (c['HHSQ1'] == 0) & (c['HHSQ2'] == 0),
+          'hhs_q10_q20_q3gt_0', "filtered_data_hhs_q10_q20_q3gt_0.xlsx", "hhs_q3_gt 0 but hhs_q2_0 and hhs_q1_0",
+          ERROR),
+)
+
+CHECKS_BY_ID = {check.id: check for check in CHECKS}
+
+
+class _Arrays(dict):
+    # Each column of the frame as a NumPy array, converted once for all checks
+    # and blocks
+    def __init__(self, df):
+        super().__init__()
+        self.df = df
+        self._lock = threading.Lock()
+
+    def __missing__(self, column):
+        with self._lock:
+            if column not in self:
+                self[column] = self.df[column].to_numpy()
+            return dict.__getitem__(self, column)
+
+    def matrix(self, columns):
+        # The columns side by side in their common NumPy dtype (float when
+        # any has missing values) and in column order, so that each column of
+        # a comparison stays contiguous
+        key = tuple(columns)
+        with self._lock:
+            if key not in self:
+                values = [self.df[column].to_numpy() for column in key]
+                if any(v.dtype == object for v in values):
+                    values = [self.df[column].to_numpy(dtype="float64", na_value=np.nan) for column in key]
+                matrix = np.empty((len(self.df), len(key)), dtype=np.result_type(*values), order="F")
+                for position, column in enumerate(values):
+                    matrix[:, position] = column
+                self[key] = matrix
+            return dict.__getitem__(self, key)
+
+
+class _Columns(dict):
+    # The block ``rows`` of each column, as views
+    def __init__(self, arrays, rows):
+        super().__init__()
+        self.arrays = arrays
+        self.rows = rows
+
+    def __missing__(self, column):
+        values = self[column] = self.arrays[column][self.rows]
+        return values
+
+    def matrix(self, columns):
+        """The block of ``columns``, side by side, as one (rows, columns) array."""
+        return self.arrays.matrix(columns)[self.rows]
+
+    def derived(self, function):
+        """``function(self)``, computed once per block."""
+        if function not in self:
+            self[function] = function(self)
+        return self[function]
+
+
+@dataclass(frozen=True, eq=False)
+class FlagMatrix:
+    """Which rows each check flags: ``flags[:, j]`` for ``checks[j]``, which
+    flags ``hits[j]`` rows."""
+    checks: tuple
+    flags: np.ndarray
+    hits: np.ndarray
+
+    def column(self, check_id):
+        """Boolean flags of the check ``check_id``, one per row."""
+        return self.flags[:, self._position(check_id)]
+
+    def positions(self, check_id):
+        """Row positions flagged by the check ``check_id``."""
+        return np.flatnonzero(self.column(check_id))
+
+    def counts(self):
+        """Number of rows flagged by each check, by check id."""
+        return pd.Series(self.hits, index=[check.id for check in self.checks])
+
+    def scores(self, weights=SEVERITY_WEIGHTS):
+        """Issue score of each row: the sum of the ``weights`` of the
+        severities of the checks that flag it."""
+        by_weight = {}
+        for position, check in enumerate(self.checks):
+            by_weight.setdefault(weights[check.severity], []).append(position)
+        flags = self.flags.view(np.uint8)
+        scores = np.zeros(len(flags), dtype="int32")
+        for weight, positions in by_weight.items():
+            # Failed checks of this weight per row, counted in the smallest dtype
+            failed = np.zeros(len(flags), dtype=np.min_scalar_type(len(positions)))
+            for position in positions:
+                failed += flags[:, position]
+            scores += failed * np.int32(weight)
+        return scores
+
+    def _position(self, check_id):
+        for position, check in enumerate(self.checks):
+            if check.id == check_id:
+                return position
+        raise KeyError(check_id)
+
+
+def top_records(scores, k, groups=None):
+    """Positions of the ``k`` rows with the highest (positive) ``scores``,
+    or of the ``k`` highest of each group when ``groups`` gives each row a
+    non-negative integer group code: by group, then highest score first and
+    earlier rows first among equal scores.
+
+    Only the candidates of each group are partitioned, so the cost stays
+    linear in the number of rows rather than that of sorting them.
+    """
+    candidates = np.flatnonzero(scores > 0)
+    if groups is None:
+        segments = [candidates]
+    else:
+        codes = groups[candidates]
+        # In the smallest unsigned dtype, which NumPy radix sorts up to 16 bits
+        codes = codes.astype(np.min_scalar_type(codes.max(initial=0)))
+        order = np.argsort(codes, kind="stable")
+        candidates, codes = candidates[order], codes[order]
+        segments = np.split(candidates, np.flatnonzero(np.diff(codes)) + 1)
+    top = []
+    for segment in segments:
+        # One key per row, the higher the better: score, then earlier row
+        keys = scores[segment].astype("int64") * len(scores) - segment
+        if len(segment) > k:
+            chosen = np.argpartition(keys, len(segment) - k)[len(segment) - k:]
+            segment, keys = segment[chosen], keys[chosen]
+        top.append(segment[np.argsort(-keys)])
+    return np.concatenate(top)
+
+
+def _evaluate_block(checks, arrays, flags, rows):
+    # Fills the block ``rows`` of ``flags``; returns its hits per check
+    columns = _Columns(arrays, rows)
+    hits = np.zeros(len(checks), dtype="int64")
+    for position, check in enumerate(checks):
+        block = flags[rows, position]
+        block[:] = check.predicate(columns)
+        hits[position] = np.count_nonzero(block)
+    return hits
+
+
+def evaluate(df, checks=CHECKS, max_workers=None):
+    """Run ``checks`` over the rows of ``df`` (with ``add_check_columns``).
+
+    Datasets of at least twice ``MIN_BLOCK_ROWS`` rows are split into one
+    block of rows per thread, up to ``max_workers`` (default
+    ``CHECK_WORKERS``); the results are the same in any case.
+    """
+    checks = tuple(checks)
+    arrays = _Arrays(df)
+    # One contiguous column per check, of which each block fills a slice
+    flags = np.zeros((len(df), len(checks)), dtype=bool, order="F")
+    workers = CHECK_WORKERS if max_workers is None else max_workers
+    blocks = max(1, min(workers, len(df) // MIN_BLOCK_ROWS))
+    bounds = np.linspace(0, len(df), blocks + 1).astype(int)
+    rows = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+    if blocks == 1:
+        hits = [_evaluate_block(checks, arrays, flags, rows[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=blocks, thread_name_prefix="checks") as pool:
+            hits = list(pool.map(lambda block: _evaluate_block(checks, arrays, flags, block), rows))
+    return FlagMatrix(checks, flags, np.sum(hits, axis=0))
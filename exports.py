@@ -0,0 +1,469 @@
+"""Excel exports of the rows flagged by the Data Issues checks, cached on disk.
+
+An export only depends on the dataset version, the flagged rows, the check and
+its columns, so each workbook is stored under a digest of those in
+``EXPORT_DIR`` and built at most once per version of the data; a state filter
+that selects other rows simply addresses another workbook. The least recently
+used exports are removed once they take more than ``MAX_BYTES``.
+
+``export_button`` offers an export on the Data Issues tab without building it:
+the workbook is only produced (or read from the cache) when a user asks for it.
+An ``IssueReport`` collects the checks of the tab to offer all of them at once,
+as one workbook or as a zip of CSV or Parquet files, written block by block,
+answers combined queries over them through a ``flag_index.FlagIndex`` and
+ranks the records for back-checks by their issue score.
+Its checks are evaluated once per dataset version; a check's rows are only
+looked up when its section of the tab is opened or an export is requested.
+"""
+import glob
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+import xlsxwriter
+
+from checks import FOOD_GROUP_NAMES, SEVERITY_WEIGHTS, add_check_columns, evaluate, food_consistency, top_records
+from flag_index import DIMENSIONS, FlagIndex
+from ingest import CACHE_DIR, full_record
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.path.join(CACHE_DIR, "exports")
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIME = "application/zip"
+MAX_BYTES = int(float(os.environ.get("QC_EXPORT_CACHE_MB", 512)) * 2 ** 20)
+# Rows of a check held as full records at a time by the combined exports
+BLOCK_ROWS = 2000
+# Dataset versions (or row selections of them) whose check results are kept, see IssueReport.of
+CHECKED_VERSIONS = 4
+
+
+def _workbook(frame, sheet_name):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        full_record(frame).to_excel(writer, index=False, sheet_name=sheet_name)
+    return output.getvalue()
+
+
+def export_key(frame, check):
+    """Content address of the export of ``frame`` for ``check``, or None when
+    ``frame`` does not come from a ``shared_dataset.processed_dataset``."""
+    version = frame.attrs.get("processed_path")
+    if version is None:
+        return None
+    digest = hashlib.sha256()
+    for part in (version, check, "\t".join(map(str, frame.columns))):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    # The flagged rows, by their labels in the dataset
+    digest.update(pd.util.hash_pandas_object(frame.index, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _write_atomic(data, target):
+    # Same private-file-and-rename scheme as ingest._write_atomic
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def evict(max_bytes=None):
+    """Remove the least recently used exports until all take at most
+    ``max_bytes`` (default ``MAX_BYTES``)."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    exports = []
+    for path in glob.glob(os.path.join(glob.escape(EXPORT_DIR), "*.*")):
+        if path.endswith(".tmp"):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        exports.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in exports)
+    for _, size, path in sorted(exports):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def _cached(key, suffix, build, what):
+    # The export stored under ``key``, built and stored on a miss
+    if key is None:
+        return build()
+
+    path = os.path.join(EXPORT_DIR, key + suffix)
+    try:
+        with open(path, "rb") as cached:
+            data = cached.read()
+        # Marks the export as used for evict()
+        os.utime(path)
+        return data
+    except OSError:
+        pass
+
+    data = build()
+    try:
+        _write_atomic(data, path)
+    except OSError as exc:
+        logger.warning("Could not cache the %s export: %s", what, exc)
+    else:
+        evict()
+    return data
+
+
+def excel_export(frame, sheet_name):
+    """Return the Excel workbook (bytes) of the full records of ``frame``, in
+    one sheet named ``sheet_name``, which also identifies the check."""
+    return _cached(export_key(frame, sheet_name), ".xlsx", lambda: _workbook(frame, sheet_name), sheet_name)
+
+
+def _offer(label, key, file_name, mime, build):
+    # A button that builds the export and then shows its download button
+    if st.button(label, key=key):
+        with st.spinner(f"Preparing {file_name}..."):
+            data = build()
+        st.download_button(f"Save {file_name}", data, file_name=file_name, mime=mime, key=key + ":save")
+
+
+def export_button(frame, sheet_name, file_name, label):
+    """Offer the export of ``frame`` as ``file_name``: a button labelled
+    ``label`` that builds the workbook and then shows its download button.
+
+    Nothing is built or sent to the browser before the click, so rendering a
+    check costs the same however many rows it flags.
+    """
+    _offer(label, f"export:{file_name}:{label}", file_name, XLSX_MIME, lambda: excel_export(frame, sheet_name))
+
+
+def _sheet_name(check):
+    # Unique, and a valid sheet name: at most 31 characters, none of []:*?/\\
+    return re.sub(r"[\[\]:*?/\\]", "_", f"{check.number}. {check.sheet_name}")[:31]
+
+
+@dataclass(frozen=True)
+class IssueCheck:
+    """A ``checks.Check`` shown on the Data Issues tab and the positions in
+    ``df`` of the rows it flagged."""
+    check: object
+    df: object
+    positions: object
+
+    @property
+    def name(self):
+        return _sheet_name(self.check)
+
+    def blocks(self):
+        """The full records of the flagged rows, ``BLOCK_ROWS`` at a time; only
+        one block of them is built at once."""
+        for start in range(0, len(self.positions), BLOCK_ROWS):
+            yield full_record(self.df.iloc[self.positions[start:start + BLOCK_ROWS]])
+
+
+def _rows(block):
+    # Python values for xlsxwriter, with blanks for missing values as to_excel
+    # writes them; xlsxwriter cannot write infinities as numbers either
+    values = block.astype(object)
+    present = block.notna() & ~block.isin([np.inf, -np.inf])
+    return values.where(present, None).itertuples(index=False, name=None)
+
+
+def _arrow_block(block):
+    # Object columns as strings, so that every block of a check has the same schema
+    strings = block.select_dtypes(include="object").columns
+    return pa.Table.from_pandas(block.astype({column: "string" for column in strings}), preserve_index=False)
+
+
+# Groupings of the worst records, and the columns they are taken per
+WORST_BY = {"All records": (), "State": ("QState",), "Enumerator": ("QState", "Enumerator")}
+
+# Check columns, flags, index and scores per dataset version, most recently used last
+_checked = OrderedDict()
+_checked_lock = threading.Lock()
+
+
+class IssueReport:
+    """The checks of a Data Issues tab, offered one by one and all together.
+
+    ``flags`` is the ``checks.evaluate`` result for ``df``, ``index`` its
+    FlagIndex and ``scores`` the issue score of each record (computed on
+    first use when not given). ``show_summary`` lists the counts of every
+    check; ``section`` and ``show_checks`` render checks in place of their
+    hand-written sections, ``export_all_buttons`` offers the combined exports
+    and ``show_worst`` the records to back-check first.
+    """
+
+    def __init__(self, df, flags, index=None, scores=None):
+        self.df = df
+        self.flags = flags
+        self._index = index
+        self._scores = scores
+
+    @classmethod
+    def of(cls, df, survey):
+        """The IssueReport of ``df``, with ``checks.add_check_columns`` added
+        to a shallow copy of it.
+
+        The check columns, the flags, their index and the issue scores are
+        computed once per version of a ``shared_dataset.processed_dataset``
+        and selection of its rows, and then shared by every rerun and session.
+        """
+        df = df.copy(deep=False)
+        version = df.attrs.get("processed_path")
+        # The rows by their labels, as a state filter selects other rows of the same version
+        rows = hashlib.sha256(pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes()).hexdigest()
+        key = (version, rows, survey)
+        with _checked_lock:
+            cached = _checked.get(key) if version is not None else None
+            if cached is not None:
+                _checked.move_to_end(key)
+        if cached is not None:
+            columns, flags, index, scores = cached
+            for column, values in columns.items():
+                df[column] = values
+            return cls(df, flags, index, scores)
+
+        loaded = set(df.columns)
+        add_check_columns(df, survey)
+        flags = evaluate(df)
+        report = cls(df, flags, FlagIndex.build(df, flags), flags.scores())
+        if version is not None:
+            columns = {column: df[column] for column in df.columns if column not in loaded}
+            with _checked_lock:
+                _checked[key] = (columns, flags, report.index, report.scores)
+                while len(_checked) > CHECKED_VERSIONS:
+                    _checked.popitem(last=False)
+        return report
+
+    @property
+    def index(self):
+        """The FlagIndex of ``flags``."""
+        if self._index is None:
+            self._index = FlagIndex.build(self.df, self.flags)
+        return self._index
+
+    @property
+    def scores(self):
+        """Issue score of each record (``checks.FlagMatrix.scores``)."""
+        if self._scores is None:
+            self._scores = self.flags.scores()
+        return self._scores
+
+    def rows(self, check_id):
+        """The rows of ``df`` flagged by the check ``check_id``."""
+        return self.df.iloc[self.flags.positions(check_id)]
+
+    def show_summary(self):
+        """The number of records flagged by every check, from the index."""
+        st.dataframe(self.summary().drop(columns="Sheet"), hide_index=True)
+
+    def section(self, title, first, last=None):
+        """A toggle for the checks numbered ``first`` to ``last`` (default
+        ``first``), labelled with how many records they flag; True when open."""
+        last = first if last is None else last
+        counts = self.index.counts()
+        flagged = sum(counts[check.id] for check in self.flags.checks if first <= check.number <= last)
+        return st.toggle(f"{title} ({flagged} flagged records)", key=f"section:{first}-{last}")
+
+    def show_checks(self, first, last=None):
+        """Show the checks numbered ``first`` to ``last`` (default ``first``):
+        their description, how many records they flag and the export."""
+        last = first if last is None else last
+        for check in self.flags.checks:
+            if first <= check.number <= last:
+                self._show(check)
+
+    def _show(self, check):
+        frame = self.rows(check.id)
+        st.markdown(f"{check.number}. **{check.description}:**")
+        st.write(f"There are {len(frame)} such records.")
+        if frame.empty:
+            st.write("No records found for this condition.")
+            return
+        export_button(frame, check.sheet_name, check.file_name, f"Download Filtered Data ({check.label}) as Excel")
+        if check.note:
+            st.write(check.note.format(count=len(frame)))
+
+    def show_query(self):
+        """Count (and offer the export of) the records failing some checks
+        but none of others, within a state, residence status, enumerator and
+        day, with the hit counts of every check among them."""
+        index = self.index
+        names = {check.number: f"{check.number}. {check.description}" for check in index.checks}
+        failing = st.multiselect("Failing all of", list(names), format_func=names.get, key="query:failing")
+        passing = st.multiselect("But none of", list(names), format_func=names.get, key="query:passing")
+        rows = index.all()
+        for number in failing:
+            rows &= index.check(number)
+        for number in passing:
+            rows -= index.check(number)
+        for column, (dimension, name) in zip(st.columns(len(DIMENSIONS)), DIMENSIONS.items()):
+            choice = column.selectbox(name, ["All"] + index.values(dimension), key=f"query:{dimension}")
+            if choice != "All":
+                rows &= index.value(dimension, choice)
+
+        count = rows.count()
+        st.write(f"There are {count} such records.")
+        if count:
+            export_button(self.df.iloc[rows.positions()], 'Combined Query', "combined_query.xlsx",
+                          "Download these records as Excel")
+            st.dataframe(index.summary(within=rows), hide_index=True)
+
+    def worst(self, k, by=()):
+        """The ``k`` records with the highest issue score, overall or per
+        value of the columns ``by``, with their score and the numbers of the
+        checks they fail in front."""
+        groups = None
+        if by:
+            groups = self.df.groupby(list(by), observed=True, dropna=False).ngroup().to_numpy()
+        positions = top_records(self.scores, k, groups)
+        numbers = [str(check.number) for check in self.flags.checks]
+        failed = [", ".join(number for number, flag in zip(numbers, flags) if flag)
+                  for flags in self.flags.flags[positions]]
+        # A copy of the selected rows only, which keeps the attrs full_record and export_key read
+        frame = self.df.iloc[positions].copy()
+        frame.insert(0, "Failed checks", failed)
+        frame.insert(0, "Issue score", self.scores[positions])
+        return frame
+
+    def show_worst(self):
+        """Offer the records to back-check first: the highest issue scores,
+        overall or per state or enumerator, in one export."""
+        weights = ", ".join(f"{weight} ({severity})" for severity, weight in SEVERITY_WEIGHTS.items())
+        left, right = st.columns(2)
+        k = left.number_input("Records", min_value=1, value=20, step=5, key="worst:k")
+        per = right.selectbox("Per", list(WORST_BY), key="worst:by")
+        frame = self.worst(int(k), WORST_BY[per])
+        st.write(f"There are {len(frame)} such records; each failed check scores {weights}.")
+        if not frame.empty:
+            export_button(frame, 'Worst Records', "worst_records.xlsx", "Download the worst records as Excel")
+            shown = ["Issue score", "Failed checks"] + [column for column in DIMENSIONS if column in frame]
+            st.dataframe(frame[shown], hide_index=True)
+
+    def show_food_consistency(self):
+        """Per state and enumerator, the percentage of households whose 7-day
+        and 24-hour answers contradict each other, per food group (the
+        checks 5-36)."""
+        tables = food_consistency(self.df).rates([self.df["QState"], self.df["Enumerator"]])
+        titles = ("Consumed in the last 24hrs but not in the last 7 days",
+                  "Consumed all 7 days but not in the last 24hrs")
+        for title, table in zip(titles, tables):
+            st.markdown(f"**{title} (% of households):**")
+            st.dataframe(table.rename(columns=FOOD_GROUP_NAMES).round(1))
+
+    def summary(self):
+        """Number of records flagged by each check."""
+        counts = self.index.counts()
+        checks = self.flags.checks
+        return pd.DataFrame({
+            "Check": [check.number for check in checks],
+            "Sheet": [_sheet_name(check) if counts[check.id] else "" for check in checks],
+            "Severity": [check.severity for check in checks],
+            "Description": [check.description for check in checks],
+            "Records": [counts[check.id] for check in checks],
+        })
+
+    def _flagging(self):
+        # Every check with hits, and the positions of its rows
+        counts = self.index.counts()
+        return [IssueCheck(check, self.df, self.flags.positions(check.id))
+                for check in self.flags.checks if counts[check.id]]
+
+    def key(self, kind):
+        """Content address of the combined export ``kind``, or None unless ``df``
+        comes from a ``shared_dataset.processed_dataset``: a digest of the
+        dataset version, the columns and the labels of the rows each check
+        flags, taken from the flags without building any of the rows."""
+        version = self.df.attrs.get("processed_path")
+        if version is None:
+            return None
+        digest = hashlib.sha256()
+        for part in (kind, version, "\t".join(map(str, self.df.columns))):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        labels = pd.util.hash_pandas_object(self.df.index, index=False).to_numpy()
+        for check in self._flagging():
+            digest.update(check.name.encode())
+            digest.update(b"\0")
+            digest.update(labels[check.positions].tobytes())
+        return digest.hexdigest()
+
+    def workbook(self):
+        """One workbook (bytes): a summary sheet of the record counts and one
+        sheet per check with hits, written row by row in constant memory."""
+        output = BytesIO()
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True,
+                                                "default_date_format": "yyyy-mm-dd hh:mm:ss"})
+        summary = self.summary()
+        sheet = workbook.add_worksheet("Summary")
+        # Rows go out in order: constant memory mode writes each row once the next one starts
+        sheet.write_row(0, 0, list(summary.columns))
+        for row, values in enumerate(_rows(summary), start=1):
+            sheet.write_row(row, 0, values)
+
+        for check in self._flagging():
+            sheet = workbook.add_worksheet(check.name)
+            row = 1
+            for block in check.blocks():
+                if row == 1:
+                    sheet.write_row(0, 0, list(block.columns))
+                for values in _rows(block):
+                    sheet.write_row(row, 0, values)
+                    row += 1
+        workbook.close()
+        return output.getvalue()
+
+    def archive(self, fmt):
+        """A zip (bytes) of ``summary.csv`` and one ``fmt`` ("csv" or "parquet")
+        file per check with hits, written block by block."""
+        output = BytesIO()
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("summary.csv", self.summary().to_csv(index=False))
+            for check in self._flagging():
+                stem = os.path.splitext(check.check.file_name)[0]
+                with archive.open(f"{check.check.number:02d}_{stem}.{fmt}", "w") as entry:
+                    if fmt == "csv":
+                        for start, block in enumerate(check.blocks()):
+                            entry.write(block.to_csv(index=False, header=start == 0).encode())
+                    else:
+                        writer = None
+                        for block in check.blocks():
+                            table = _arrow_block(block)
+                            if writer is None:
+                                writer = pq.ParquetWriter(entry, table.schema)
+                            writer.write_table(table.cast(writer.schema))
+                        writer.close()
+        return output.getvalue()
+
+    def export_all_buttons(self, file_stem="all_issues"):
+        """Offer every check at once: as one workbook or as a zip of CSV or
+        Parquet files, which are much faster to write."""
+        _offer("Download all issues as one Excel workbook", f"export-all:{file_stem}:xlsx",
+               f"{file_stem}.xlsx", XLSX_MIME,
+               lambda: _cached(self.key("xlsx"), ".xlsx", self.workbook, "all issues"))
+        for fmt, name in (("csv", "CSV"), ("parquet", "Parquet")):
+            _offer(f"Download all issues as {name} files (zip)", f"export-all:{file_stem}:{fmt}",
+                   f"{file_stem}_{fmt}.zip", ZIP_MIME,
+                   lambda fmt=fmt: _cached(self.key(fmt), f".{fmt}.zip", lambda: self.archive(fmt), "all issues"))
@@ -0,0 +1,136 @@
+"""Bit-packed index of the Data Issues flags, for combined queries.
+
+The rows flagged by each check, and the rows of each state, residence status,
+enumerator and day, are kept as bitsets over the rows of the dataset in uint64
+words. "Failing 5 and 37 but not 47, in Kassala, enumerator C" is then a few
+word-wise operations and a popcount over n/64 words instead of a new filter
+over the frame, and the hit counts of every check within any selection come
+out of one pass over the packed flags.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Columns rows can be selected by, and their names on the dashboards
+DIMENSIONS = {"QState": "State", "Q2_1": "Residence status", "Enumerator": "Enumerator", "Day": "Day"}
+
+
+def _pack(matrix):
+    # Bitsets of the columns of a boolean (rows, k) matrix, as a (k, words) uint64 array
+    rows, k = matrix.shape
+    packed = np.zeros((k, -(-rows // 64) * 8), dtype=np.uint8)
+    packed[:, :-(-rows // 8)] = np.packbits(np.ascontiguousarray(matrix.T), axis=1, bitorder="little")
+    return packed.view("<u8")
+
+
+def _pack_codes(codes, k):
+    # Bitsets of the rows of each code 0..k-1 (-1: none), as _pack(codes[:, None] == np.arange(k))
+    # without that dense matrix: rows sorted by code give each bitset's bytes in order
+    packed = np.zeros((k, -(-len(codes) // 64) * 8), dtype=np.uint8)
+    positions = np.flatnonzero(codes >= 0)
+    if len(positions):
+        codes = codes[positions].astype(np.min_scalar_type(k))
+        order = np.argsort(codes, kind="stable")
+        positions, codes = positions[order], codes[order]
+        # Byte of each row in the flat bitsets, and its bit in that byte
+        keys = codes.astype(np.int64) * packed.shape[1] + (positions >> 3)
+        bits = np.left_shift(1, positions & 7).astype(np.uint8)
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        packed.reshape(-1)[keys[starts]] = np.bitwise_or.reduceat(bits, starts)
+    return packed.view("<u8")
+
+
+@dataclass(frozen=True, eq=False)
+class Bits:
+    """A set of rows of the dataset, as a bitset of ``size`` bits."""
+    words: np.ndarray
+    size: int
+
+    def __and__(self, other):
+        return Bits(self.words & other.words, self.size)
+
+    def __or__(self, other):
+        return Bits(self.words | other.words, self.size)
+
+    def __sub__(self, other):
+        return Bits(self.words & ~other.words, self.size)
+
+    def __invert__(self):
+        words = ~self.words
+        # Bits past the last row stay clear
+        if self.size % 64:
+            words[-1] &= np.uint64((1 << (self.size % 64)) - 1)
+        return Bits(words, self.size)
+
+    def count(self):
+        """Number of rows in the set."""
+        return int(np.bitwise_count(self.words).sum())
+
+    def positions(self):
+        """Positions of the rows in the set, in row order."""
+        return np.flatnonzero(np.unpackbits(self.words.view(np.uint8), count=self.size, bitorder="little"))
+
+
+class FlagIndex:
+    """Bitsets of the checks of a ``checks.FlagMatrix`` and of the values of
+    ``DIMENSIONS``, over the rows of one dataset."""
+
+    def __init__(self, checks, flag_words, dimensions, size):
+        self.checks = checks
+        self.size = size
+        self._flag_words = flag_words
+        self._dimensions = dimensions
+        self._by_key = {key: position for position, check in enumerate(checks) for key in (check.id, check.number)}
+
+    @classmethod
+    def build(cls, df, flags, dimensions=DIMENSIONS):
+        """Index the ``flags`` of ``df`` (``checks.evaluate(df)``)."""
+        packed = {}
+        for column in dimensions:
+            if column not in df:
+                continue
+            codes, values = pd.factorize(df[column], sort=True)
+            packed[column] = (list(values), _pack_codes(codes, len(values)))
+        return cls(flags.checks, _pack(flags.flags), packed, len(df))
+
+    def all(self):
+        """Every row."""
+        return ~Bits(np.zeros(self._flag_words.shape[1], dtype="<u8"), self.size)
+
+    def check(self, key):
+        """Rows flagged by a check, given by id or by its number on the tab."""
+        return Bits(self._flag_words[self._by_key[key]], self.size)
+
+    def values(self, dimension):
+        """Values of ``dimension`` present in the dataset, sorted."""
+        return self._dimensions[dimension][0]
+
+    def value(self, dimension, value):
+        """Rows where ``dimension`` is ``value`` (empty for a value not present)."""
+        values, words = self._dimensions[dimension]
+        if value not in values:
+            return Bits(np.zeros(words.shape[1], dtype="<u8"), self.size)
+        return Bits(words[values.index(value)], self.size)
+
+    def counts(self, within=None):
+        """Rows flagged by each check, among ``within`` (default all rows),
+        by check id."""
+        flags = self._flag_words if within is None else self._flag_words & within.words
+        return pd.Series(np.bitwise_count(flags).sum(axis=1, dtype="int64"),
+                         index=[check.id for check in self.checks])
+
+    def summary(self, within=None, by=None):
+        """One table of the records flagged by each check, among ``within``,
+        in total or, with ``by``, per value of that dimension."""
+        table = pd.DataFrame({
+            "Check": [check.number for check in self.checks],
+            "Description": [check.description for check in self.checks],
+        })
+        within = self.all() if within is None else within
+        if by is None:
+            table["Records"] = self.counts(within).to_numpy()
+        else:
+            for value in self.values(by):
+                table[value] = self.counts(within & self.value(by, value)).to_numpy()
+        return table
@@ -0,0 +1,234 @@
+"""Loading of the raw survey exports through an on-disk columnar cache.
+
+The tab-delimited exports are parsed once per file version and kept as Parquet
+under ``CACHE_DIR``; every later load (e.g. each Streamlit rerun) reads the
+Parquet copy instead of re-parsing the text.
+"""
+import functools
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("QC_CACHE_DIR", ".qc_cache")
+RAW_CACHE_DIR = os.path.join(CACHE_DIR, "raw")
+
+# Content digests already computed by this process, keyed by (path, size, mtime)
+# so an unchanged export is only hashed once.
+_digests = {}
+
+
+@dataclass(frozen=True)
+class ExportFingerprint:
+    """Identity of one version of an export file."""
+    path: str
+    size: int
+    mtime_ns: int
+    digest: str
+
+    @property
+    def key(self):
+        # Readable file stem, a short hash of the full path (two rounds may share
+        # a file name in different folders) and the content digest.
+        stem = os.path.splitext(os.path.basename(self.path))[0]
+        path_hash = hashlib.sha1(self.path.encode()).hexdigest()[:8]
+        return f"{stem}-{path_hash}-{self.digest[:16]}"
+
+
+def fingerprint(path):
+    """Return the ExportFingerprint of ``path``.
+
+    Size and mtime decide whether the content has to be hashed again; the
+    content digest decides which cached copy belongs to the file. ``path``
+    may itself be an ExportFingerprint, e.g. a handle kept from an earlier
+    call, which is returned as is while the file is unchanged.
+    """
+    if isinstance(path, ExportFingerprint):
+        handle, path = path, path.path
+        stat = os.stat(path)
+        if (stat.st_size, stat.st_mtime_ns) == (handle.size, handle.mtime_ns):
+            return handle
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stat_key = (path, stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(stat_key)
+    if digest is None:
+        with open(path, "rb") as export_file:
+            digest = hashlib.file_digest(export_file, "sha256").hexdigest()
+        _digests[stat_key] = digest
+    return ExportFingerprint(path, stat.st_size, stat.st_mtime_ns, digest)
+
+
+def _cache_path(fp, columns=None, schema=None):
+    name = fp.key
+    if columns is not None:
+        # Projections are cached separately from the full conversion
+        name += "-cols-" + hashlib.sha1("\t".join(columns).encode()).hexdigest()[:8]
+    if schema is not None:
+        name += f"-{schema.survey}-v{schema.version}"
+    return os.path.join(RAW_CACHE_DIR, name + ".parquet")
+
+
+def _write_atomic(df, target):
+    # Several sessions may convert the same export at once; write to a private
+    # temporary file and rename it so readers never see a partial file.
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _drop_stale(fp):
+    # Conversions of older versions of the same export are never read again.
+    prefix = fp.key.rsplit("-", 1)[0] + "-"
+    for old in glob.glob(os.path.join(RAW_CACHE_DIR, glob.escape(prefix) + "*.parquet")):
+        if not os.path.basename(old).startswith(fp.key):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def _fits(series, dtype):
+    # Integer dtypes hold neither missing answers nor out-of-range codes
+    if series.isna().any() or not pd.api.types.is_numeric_dtype(series):
+        return False
+    info = np.iinfo(dtype)
+    return bool(((series >= info.min) & (series <= info.max) & (series % 1 == 0)).all())
+
+
+def apply_schema(df, schema, source=None, report_unknown=True):
+    """Cast the columns of ``df`` to the dtypes of ``schema`` in place.
+
+    Integer columns that cannot be stored exactly fall back to float32;
+    columns the schema does not know are left as parsed and reported.
+    """
+    for column in df.columns.intersection(list(schema.dtypes)):
+        dtype = schema.dtypes[column]
+        series = df[column]
+        try:
+            if dtype == "category" or not pd.api.types.is_integer_dtype(dtype) or _fits(series, dtype):
+                df[column] = series.astype(dtype)
+            else:
+                df[column] = series.astype("float32")
+        except (ValueError, TypeError) as exc:
+            logger.warning("Column %s of %s kept as %s: %s", column, source, series.dtype, exc)
+
+    unknown = [column for column in df.columns if column not in schema.dtypes]
+    if unknown and report_unknown:
+        logger.warning("%d column(s) of %s not in the %s schema v%s: %s", len(unknown), source,
+                       schema.survey, schema.version, ", ".join(unknown[:10]))
+    return df
+
+
+def _store(df, fp, cache_path):
+    try:
+        _write_atomic(df, cache_path)
+    except (ValueError, TypeError, NotImplementedError) as exc:
+        # Columns Arrow cannot represent (e.g. mixed object types) only cost
+        # the cache, not the load.
+        logger.warning("Could not cache %s as Parquet: %s", fp.path, exc)
+    else:
+        _drop_stale(fp)
+
+
+def read_export(path, columns=None, schema=None):
+    """Load a tab-delimited survey export (a path or its ExportFingerprint),
+    converting it to Parquet on first use.
+
+    With ``columns`` (e.g. ``survey_columns.required_columns(survey)``) only
+    those columns are parsed and kept; names missing from the export are
+    skipped. ``full_record`` brings back the remaining columns when needed.
+    With ``schema`` (``survey_columns.export_schema(survey)``) the columns are
+    stored in its compact dtypes, see ``apply_schema``.
+    """
+    fp = fingerprint(path)
+    full_path = _cache_path(fp)
+    cache_path = _cache_path(fp, columns, schema)
+    if os.path.exists(cache_path):
+        df = pd.read_parquet(cache_path)
+    else:
+        if os.path.exists(full_path):
+            if columns is not None:
+                wanted = set(columns)
+                columns = [c for c in pq.read_schema(full_path).names if c in wanted]
+            df = pd.read_parquet(full_path, columns=columns)
+        else:
+            usecols = None
+            if columns is not None:
+                wanted = set(columns)
+                usecols = lambda column: column in wanted
+            df = pd.read_csv(fp.path, delimiter='\t', low_memory=False, usecols=usecols)
+        if schema is not None:
+            apply_schema(df, schema, fp.path)
+        _store(df, fp, cache_path)
+
+    # Lets full_record() find the rest of each row, through filters and renames
+    df.attrs["export_path"] = fp.path
+    df.attrs["export_columns"] = tuple(df.columns)
+    return df
+
+
+def iter_export(path, columns=None, schema=None, chunksize=100_000):
+    """Yield an export as DataFrames of at most ``chunksize`` rows.
+
+    Takes the same ``columns`` and ``schema`` as ``read_export`` but never
+    holds more than one chunk: a Parquet conversion that already exists is
+    read batch by batch, otherwise the text is parsed in chunks (and, being
+    too large to load, not converted). Row labels continue across chunks.
+    """
+    fp = fingerprint(path)
+    wanted = None if columns is None else set(columns)
+    cached = [p for p in (_cache_path(fp, columns, schema), _cache_path(fp)) if os.path.exists(p)]
+    if cached:
+        parquet = pq.ParquetFile(cached[0])
+        if wanted is not None:
+            columns = [c for c in parquet.schema_arrow.names if c in wanted]
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(chunksize, columns=columns))
+    else:
+        usecols = None if wanted is None else (lambda column: column in wanted)
+        chunks = pd.read_csv(fp.path, delimiter='\t', low_memory=False, usecols=usecols, chunksize=chunksize)
+
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        if schema is not None:
+            apply_schema(chunk, schema, fp.path, report_unknown=start == len(chunk))
+        yield chunk
+
+
+@functools.lru_cache(maxsize=2)
+def _full_export(fp):
+    return read_export(fp.path)
+
+
+def full_record(frame):
+    """Return ``frame`` with the export columns that were not loaded appended.
+
+    ``frame`` is a (filtered, renamed, extended) descendant of a projected
+    ``read_export`` result; rows are matched on the original row labels.
+    """
+    path = frame.attrs.get("export_path")
+    loaded = frame.attrs.get("export_columns")
+    if path is None or loaded is None:
+        return frame
+    full = _full_export(fingerprint(path))
+    loaded = set(loaded)
+    missing = [c for c in full.columns if c not in loaded and c not in frame.columns]
+    if not missing:
+        return frame
+    return frame.join(full.loc[frame.index, missing])
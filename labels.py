@@ -0,0 +1,28 @@
+"""Value labels stored as ordered categoricals.
+
+A label column holds one small integer code per household and a single list of
+labels per column, shared by every frame of the survey, instead of one Python
+string per row; counting and filtering then work on the codes.
+"""
+import numpy as np
+import pandas as pd
+
+
+def label_dtype(mapping):
+    """Ordered categorical dtype of the labels of ``mapping``, in code order."""
+    return pd.CategoricalDtype(list(dict.fromkeys(mapping[code] for code in sorted(mapping))), ordered=True)
+
+
+def map_labels(codes, mapping, dtype=None):
+    """Label ``codes`` through ``mapping``, as ``Series.map`` would, but as a
+    categorical of ``dtype`` (default ``label_dtype(mapping)``).
+
+    Codes ``mapping`` does not know (and missing codes) get a missing label.
+    """
+    if dtype is None:
+        dtype = label_dtype(mapping)
+    # Position of each code in ``mapping``, then of its label in the categories
+    positions = pd.Index(list(mapping)).get_indexer(codes)
+    label_codes = dtype.categories.get_indexer(list(mapping.values()))
+    label_codes = np.where(positions >= 0, label_codes[positions], -1)
+    return pd.Series(pd.Categorical.from_codes(label_codes, dtype=dtype), index=codes.index)
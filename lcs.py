@@ -0,0 +1,44 @@
+"""Livelihood Coping Strategies for food security (LCS-FS).
+
+Each strategy column holds the household's answer; codes 2 ("yes") and 4
+("no, because the strategy was already used up") both count as having used
+it. A household is classed by the most severe group of strategies it used.
+"""
+import numpy as np
+
+from labels import map_labels
+
+# Answer codes that count as having used a strategy
+USED_CODES = (2, 4)
+
+# Group column -> (severity, strategy columns) for the CFSA/FSMS questionnaire.
+# Other questionnaire variants pass their own mapping to add_lcs.
+LCS_FS_GROUPS = {
+    "emergency_coping_FS": (4, ["Lcs_em_ResAsset", "Lcs_em_Begged", "Lcs_em_last_female"]),
+    "crisis_coping_FS": (3, ["Lcs_crisis_Health", "Lcs_crisis_con_stock", "Lcs_crisis_wild_food"]),
+    "stress_coping_FS": (2, ["Lcs_stress_Saving", "Lcs_stress_accum_debt", "Lcs_stress_red_farm_liv_input",
+                             "Lcs_stress_DomAsset"]),
+}
+
+LCS_LABELS = {1: 'Minimal', 2: 'Stressed', 3: 'Crisis', 4: 'Emergency'}
+
+
+def add_lcs(df, groups=LCS_FS_GROUPS, used_codes=USED_CODES):
+    """Add one column per severity group plus ``LCS`` and ``LCS_labels``.
+
+    A group column holds the group's severity when any of its strategies was
+    used and 1 otherwise; ``LCS`` is the highest of them.
+    """
+    columns = list(dict.fromkeys(column for _, strategies in groups.values() for column in strategies))
+    used = np.isin(df[columns].to_numpy(), used_codes)
+    position = {column: i for i, column in enumerate(columns)}
+
+    severities = []
+    for name, (severity, strategies) in groups.items():
+        group_used = used[:, [position[column] for column in strategies]].any(axis=1)
+        df[name] = np.where(group_used, severity, 1)
+        severities.append(df[name].to_numpy())
+
+    df['LCS'] = np.maximum.reduce(severities) if severities else 1
+    df['LCS_labels'] = map_labels(df['LCS'], LCS_LABELS)
+    return df
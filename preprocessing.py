@@ -0,0 +1,361 @@
+"""Row-level preprocessing shared by the CFSA and FSMS dashboards.
+
+Everything here works on one household at a time (or, for the enumerator and
+day assignment, one state at a time), so it can run on the whole export or on
+chunks of it, see ``streaming``.
+"""
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from labels import label_dtype, map_labels
+from lcs import LCS_FS_GROUPS, add_lcs
+from survey_columns import (ENUMERATOR_ID_COLUMNS, FCS_COLUMNS, FOOD_CON_7DAYS_COLUMNS, GENDER_COLUMNS, RCSI_COLUMNS,
+                            rename_map)
+
+STATE_MAPPING = {
+    1: "North Darfur",
+    2: "South Darfur",
+    3: "West Darfur",
+    4: "Central Darfur",
+    5: "East Darfur",
+    6: "Kassala",
+    7: "Red Sea",
+    8: "Blue Nile",
+    9: "White Nile",
+    10: "North Kordofan",
+    11: "West Kordofan",
+    12: "South Kordofan",
+    13: "Gadarif",
+    14: "Khartoum",
+    15: "Sinnar",
+    16: "Northern State",
+    17: "AL Gazira",
+    18: "River Nile"
+}
+
+GENDER_MAPPING = {1: 'Male', 2: 'Female'}
+
+# Residence status codes differ between the two questionnaires
+RESIDENCE_MAPPINGS = {
+    "cfsa": {
+        1: 'Residents',
+        5: 'Nomads',
+        8: 'IDP hosted in the community/living with resident families',
+        9: 'IDPs living in rented accommodation'
+    },
+    "fsms": {
+        2: 'IDP in Camp',
+        3: 'IDP outside camps',
+        4: 'Refugees in Camp',
+        5: 'Refugees outside Camps',
+        6: 'Returnees IDPs',
+        7: 'Returnees Refugees',
+        8: 'IDPs in Gathering points'
+    },
+}
+
+# One category list per label column, shared by all frames of a survey
+STATE_DTYPE = label_dtype(STATE_MAPPING)
+GENDER_DTYPE = label_dtype(GENDER_MAPPING)
+RESIDENCE_DTYPES = {survey: label_dtype(mapping) for survey, mapping in RESIDENCE_MAPPINGS.items()}
+
+# Placeholder enumerators for exports without an enumerator ID column
+ENUMERATOR_NAMES = ["A", "B", "C", "D", "F", "G", "H"]
+
+
+@dataclass(frozen=True)
+class Recode:
+    """Recode of a numeric value into codes by closed ranges.
+
+    ``ranges`` holds ``(low, high, code)`` triples tried in order, ``None``
+    meaning unbounded; values matching none of them (including missing
+    values) get ``default``, where ``None`` means missing. ``labels`` names
+    the codes.
+    """
+    ranges: tuple
+    default: object = None
+    labels: dict = None
+
+    def __call__(self, values):
+        """Recode a Series at once, as ``Series.apply`` would value by value."""
+        array = np.asarray(values, dtype="float64")
+        conditions = []
+        for low, high, _code in self.ranges:
+            condition = np.ones(len(array), dtype=bool)
+            if low is not None:
+                condition &= array >= low
+            if high is not None:
+                condition &= array <= high
+            conditions.append(condition)
+        codes = np.select(conditions, [code for _, _, code in self.ranges],
+                          default=np.nan if self.default is None else self.default)
+        # Integer codes unless some value was left missing
+        if not np.isnan(codes).any():
+            codes = codes.astype("int64")
+        return pd.Series(codes, index=values.index)
+
+    def label(self, codes):
+        return map_labels(codes, self.labels)
+
+
+FCS_CATEGORY_LABELS = {1: 'Acceptable', 2: 'Borderline', 3: 'Poor'}
+
+RCSI_IPC = Recode(((None, 3, 1), (4, 18, 2)), default=3,
+                  labels={1: 'Minimal', 2: 'Stressed', 3: 'Crisis-Emergency'})
+
+# Thresholds used by WFP Sudan
+RCSI_WFP = Recode(((None, 5, 1), (6, 11, 2)), default=3,
+                  labels={1: 'Low (<6)', 2: 'Medium (6-11)', 3: 'High (>11)'})
+
+# 1, 2 = "rarely" or "sometimes", 3 = "often"; any other answer counts as never
+HHS_FREQUENCY = Recode(((1, 1, 1), (2, 2, 1), (3, 3, 2)), default=0)
+
+HHS_CAT = Recode(((0, 1, 1), (2, 3, 2), (4, None, 3)),
+                 labels={1: 'No or little hunger', 2: 'Moderate hunger', 3: 'Severe hunger'})
+
+HHS_IPC = Recode(((0, 0, 1), (1, 1, 2), (2, 3, 3), (4, 4, 4), (5, 6, 5)),
+                 labels={1: 'Minimal', 2: 'Stressed', 3: 'Crisis', 4: 'Emergency', 5: 'Catastrophe'})
+
+
+def add_labels(df, survey, residence_mapping):
+    """Replace the state, gender and residence codes with their labels
+    (ordered categoricals, see ``labels``)."""
+    # CREATING A COLUMN OF State with labels -
+    df['QState'] = map_labels(df['QState_orig'], STATE_MAPPING, STATE_DTYPE)
+
+    # Map numeric values to descriptive labels (the first gender column present)
+    for gender_column in GENDER_COLUMNS[survey]:
+        if gender_column in df:
+            df[gender_column] = map_labels(df[gender_column], GENDER_MAPPING, GENDER_DTYPE)
+            break
+
+    residence_dtype = RESIDENCE_DTYPES[survey] if residence_mapping == RESIDENCE_MAPPINGS.get(survey) else None
+    df['Q2_1'] = map_labels(df['Q2_1'], residence_mapping, residence_dtype)
+    return df
+
+
+def _counted(keys, counts):
+    # Rows already counted per key, 0 for keys not seen yet
+    return np.nan_to_num(np.asarray(keys.map(counts), dtype="float64")).astype("int64")
+
+
+def _observed_counts(keys):
+    counts = keys.value_counts()
+    return counts[counts > 0].to_dict()
+
+
+def _enumerator_key(df):
+    return df['QState'].astype(str) + "/" + df['Enumerator']
+
+
+def _enumerators_and_days(df, rows_per_state, rows_per_enumerator):
+    # Enumerators take a state's rows in turn (A, B, C, ...) unless the export
+    # names the real enumerator; each enumerator's rows then cycle through
+    # days 1..5. Positions continue after the rows already counted.
+    state = df['QState']
+    id_column = next((column for column in ENUMERATOR_ID_COLUMNS if column in df), None)
+    if id_column is None:
+        position = state.groupby(state, observed=True).cumcount().to_numpy() + _counted(state, rows_per_state)
+        enumerator = np.asarray(ENUMERATOR_NAMES)[position % len(ENUMERATOR_NAMES)]
+    else:
+        enumerator = df[id_column].astype(object).where(df[id_column].notna(), "Unknown").astype(str)
+    df['Enumerator'] = enumerator
+    rows_per_state.update(_observed_counts(state))
+
+    key = _enumerator_key(df)
+    day_position = key.groupby(key).cumcount().to_numpy() + _counted(key, rows_per_enumerator)
+    df['Day'] = day_position % 5 + 1
+    rows_per_enumerator.update(_observed_counts(key))
+    return df
+
+
+def assign_enumerators_and_days(df):
+    """Add the Enumerator and Day columns.
+
+    Rows keep their order; rows without a known state are dropped, as
+    ``groupby("QState").apply`` did.
+    """
+    return continue_enumerators_and_days(df, Counter(), Counter())
+
+
+def continue_enumerators_and_days(df, rows_per_state, rows_per_enumerator):
+    """Assign Enumerator and Day like ``assign_enumerators_and_days``, continuing
+    after the rows already counted in the two Counters.
+
+    ``rows_per_state`` counts rows per state and ``rows_per_enumerator`` per
+    "state/enumerator"; both are updated with ``df``.
+    """
+    return _enumerators_and_days(df[df['QState'].notna()].copy(), rows_per_state, rows_per_enumerator)
+
+
+def enumerator_counts(df):
+    """The two Counters ``continue_enumerators_and_days`` needs after ``df``."""
+    rows_per_state = Counter(_observed_counts(df['QState']))
+    rows_per_enumerator = Counter(_observed_counts(_enumerator_key(df)))
+    return rows_per_state, rows_per_enumerator
+
+
+# Food group weights of the FCS, in FCS_COLUMNS order
+FCS_WEIGHTS = np.array([2, 3, 4, 4, 1, 1, 0.5, 0.5, 0])
+# Positions of FCS_COLUMNS among FOOD_CON_7DAYS_COLUMNS
+_FCS_POSITIONS = np.array([FOOD_CON_7DAYS_COLUMNS.index(column) for column in FCS_COLUMNS])
+
+# Severity weights of the rCSI strategies, in RCSI_COLUMNS order
+RCSI_WEIGHTS = np.array([1, 2, 1, 3, 1])
+
+FCS_ALIASES = {'FCSStap': 'Q5_1a', 'FCSPulse': 'Q5_2a', 'FCSDairy': 'Q5_3a', 'FCSPr': 'Q5_4a', 'FCSVeg': 'Q5_5a',
+               'FCSFruit': 'Q5_6a', 'FCSFat': 'Q5_7a', 'FCSSugar': 'Q5_8a', 'FCSCond': 'Q5_9a'}
+
+# rCSILessQlty: rely on less preferred and less expensive food, rCSIBorrow: borrow
+# food or rely on help from a relative or friend, rCSIMealNb: reduce the number
+# of meals eaten in a day, rCSIMealSize: limit portion size at meal times,
+# rCSIMealAdult: restrict consumption by adults for small children to eat
+# (all in the past 7 days).
+RCSI_ALIASES = {'rCSILessQlty': 'Q6_1_1', 'rCSIBorrow': 'Q6_1_2', 'rCSIMealNb': 'Q6_1_5',
+                'rCSIMealSize': 'Q6_1_3', 'rCSIMealAdult': 'Q6_1_4'}
+
+# Frequency answers of the three HHS questions
+HHS_QUESTIONS = ('Q6_7_HHSNoFood_FR', 'Q6_8_HHSBedHung', 'Q6_11_HHSNotEat_FR')
+
+
+def _block(df, columns):
+    # One contiguous float64 matrix per question block; integer answers
+    # without missing values give integer scores again, as before.
+    block = df[columns]
+    integer = all(pd.api.types.is_integer_dtype(dtype) for dtype in block.dtypes)
+    return block.to_numpy(dtype="float64"), integer
+
+
+def _score(values, integer, index):
+    if integer and not np.isnan(values).any():
+        values = values.astype("int64")
+    return pd.Series(values, index=index)
+
+
+def _add_food_scores(df):
+    # The FCS food groups are columns of the 7-day block, gathered once
+    food_7days, integer = _block(df, FOOD_CON_7DAYS_COLUMNS)
+    # Missing answers count as 0 in the 7-day sum but leave the FCS missing
+    df['food_con_7days_sum'] = _score(np.nansum(food_7days, axis=1), integer, df.index)
+    df['fcs'] = pd.Series(food_7days[:, _FCS_POSITIONS] @ FCS_WEIGHTS, index=df.index)
+
+
+def _add_fcs_categories(df):
+    df['fcs_categories'] = pd.cut(df['fcs'], bins=[-float('inf'), 28, 42, float('inf')], labels=[3, 2, 1])
+    # 1 = Acceptable, 2 = Borderline (28-42], 3 = Poor (<= 28)
+    df['fcs_categories_labels'] = map_labels(df['fcs_categories'], FCS_CATEGORY_LABELS)
+
+
+def _add_rcsi(df):
+    rcsi, integer = _block(df, RCSI_COLUMNS)
+    df['rCSI'] = _score(rcsi @ RCSI_WEIGHTS, integer, df.index)
+
+
+def _add_hhs(df):
+    # HHSQ1: was there ever no food to eat in the HH? HHSQ2: did any HH member
+    # go to sleep hungry? HHSQ3: did any HH member go a whole day without food?
+    hhs = np.column_stack([HHS_FREQUENCY(df[column]).to_numpy(dtype="float64") for column in HHS_QUESTIONS])
+    for number in range(3):
+        df[f'HHSQ{number + 1}'] = _score(hhs[:, number], True, df.index)
+    df['HHS'] = _score(hhs.sum(axis=1), True, df.index)
+
+
+def _add_aliases(aliases):
+    def add(df):
+        for alias, column in aliases.items():
+            df[alias] = df[column]
+    return add
+
+
+def _add_recode(recode, source, code, label):
+    def add(df):
+        df[code] = recode(df[source])
+        df[label] = recode.label(df[code])
+    return add
+
+
+@dataclass(frozen=True, eq=False)
+class Derived:
+    """Derived columns ``outputs``, added together by ``add(df)`` from ``inputs``."""
+    outputs: tuple
+    inputs: tuple
+    add: object
+
+
+_LCS_STRATEGIES = tuple(dict.fromkeys(column for _, strategies in LCS_FS_GROUPS.values() for column in strategies))
+
+# The indicator graph, in the column order of the processed dataset. Inputs
+# produced by another entry are computed first; the rest are export columns.
+DERIVED = (
+    Derived(tuple(FCS_ALIASES), tuple(FCS_ALIASES.values()), _add_aliases(FCS_ALIASES)),
+    Derived(('food_con_7days_sum', 'fcs'), tuple(FOOD_CON_7DAYS_COLUMNS), _add_food_scores),
+    Derived(('fcs_categories', 'fcs_categories_labels'), ('fcs',), _add_fcs_categories),
+    Derived(tuple(RCSI_ALIASES), tuple(RCSI_ALIASES.values()), _add_aliases(RCSI_ALIASES)),
+    Derived(('rCSI',), tuple(RCSI_COLUMNS), _add_rcsi),
+    Derived(('rCSI_IPC', 'rCSI_IPC_Label'), ('rCSI',), _add_recode(RCSI_IPC, 'rCSI', 'rCSI_IPC', 'rCSI_IPC_Label')),
+    Derived(('rCSI_WFP', 'rCSI_WFP_Label'), ('rCSI',), _add_recode(RCSI_WFP, 'rCSI', 'rCSI_WFP', 'rCSI_WFP_Label')),
+    Derived(('HHSQ1', 'HHSQ2', 'HHSQ3', 'HHS'), HHS_QUESTIONS, _add_hhs),
+    Derived(('HHSCat', 'HHSCat_labels'), ('HHS',), _add_recode(HHS_CAT, 'HHS', 'HHSCat', 'HHSCat_labels')),
+    Derived(('HHS_IPC', 'HHS_IPC_labels'), ('HHS',), _add_recode(HHS_IPC, 'HHS', 'HHS_IPC', 'HHS_IPC_labels')),
+    # Livelihood coping: emergency_coping_FS, crisis_coping_FS, stress_coping_FS, LCS
+    Derived(tuple(LCS_FS_GROUPS) + ('LCS', 'LCS_labels'), _LCS_STRATEGIES, add_lcs),
+)
+
+_PRODUCERS = {column: derived for derived in DERIVED for column in derived.outputs}
+
+DERIVED_COLUMNS = tuple(_PRODUCERS)
+
+
+def add_indicators(df, columns=None):
+    """Add the derived indicator ``columns`` (default all of ``DERIVED``).
+
+    Only the entries of the indicator graph that ``columns`` depend on are
+    computed, and none whose columns ``df`` already has.
+    """
+    done = set()
+
+    def require(derived):
+        if derived in done:
+            return
+        done.add(derived)
+        if all(column in df.columns for column in derived.outputs):
+            return
+        for column in derived.inputs:
+            if column in _PRODUCERS:
+                require(_PRODUCERS[column])
+        derived.add(df)
+
+    for column in DERIVED_COLUMNS if columns is None else columns:
+        if column in _PRODUCERS:
+            require(_PRODUCERS[column])
+        elif column not in df.columns:
+            raise KeyError(f"{column!r} is neither a derived indicator nor a column of the frame")
+    return df
+
+
+def clean_hhs(df):
+    """Set HHSNoFood, HHSBedHung and HHSNotEat from their frequency questions."""
+    df['Q6_6_HHSNoFood'] = (df['Q6_7_HHSNoFood_FR'] > 0).astype("int64")
+    df['Q6_9_HHSBedHung_FR'] = (df['Q6_8_HHSBedHung'] > 0).astype("int64")
+    df['Q6_10_HHSNotEat'] = (df['Q6_11_HHSNotEat_FR'] > 0).astype("int64")
+    return df
+
+
+def prepare(df, survey, residence_mapping=None):
+    """Rename, label, clean and assign enumerators: a ``survey`` export frame
+    before its derived indicators, see ``add_indicators``."""
+    if residence_mapping is None:
+        residence_mapping = RESIDENCE_MAPPINGS[survey]
+    df = df.rename(columns=rename_map(survey))
+    df = add_labels(df, survey, residence_mapping)
+    df = clean_hhs(df)
+
+    return assign_enumerators_and_days(df)
+
+
+def preprocess(df, survey, residence_mapping=None):
+    """Run the whole pipeline on a raw ``survey`` export frame."""
+    return add_indicators(prepare(df, survey, residence_mapping))
@@ -0,0 +1,62 @@
+"""Loading several survey rounds at once, e.g. for comparisons across rounds.
+
+Each export is parsed and preprocessed in its own worker process. Workers hand
+nothing back but leave the processed dataset in the shared store, which the
+caller then memory-maps, so the frames are never pickled between processes.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from shared_dataset import processed_dataset
+from survey_columns import SURVEYS
+
+
+def survey_of(path):
+    """Survey type of an export, from its file name (CFSA_..., CFSVA_..., FSMS_...)."""
+    name = os.path.basename(path).upper()
+    if name.startswith("FSMS"):
+        return "fsms"
+    if name.startswith(("CFSA", "CFSVA")):
+        return "cfsa"
+    raise ValueError(f"Cannot tell the survey type of {path}; pass (path, survey) instead")
+
+
+def _round(export):
+    path, survey = (export, survey_of(export)) if isinstance(export, str) else export
+    if survey not in SURVEYS:
+        raise ValueError(f"Unknown survey type {survey!r} for {path}")
+    return os.path.splitext(os.path.basename(path))[0], path, survey
+
+
+def _prepare(path, survey):
+    processed_dataset(path, survey)
+
+
+def load_rounds(exports, max_workers=None, combine=False):
+    """Load and preprocess several exports in parallel.
+
+    ``exports`` lists export paths (the survey type is taken from the file
+    name) or ``(path, survey)`` pairs. Returns a dict of processed datasets
+    keyed by round (the file name without extension) or, with ``combine``,
+    one frame of all rounds with a ``round`` column. Derived indicators are
+    added with ``shared_dataset.with_indicators``.
+    """
+    rounds = [_round(export) for export in exports]
+    names = [name for name, _, _ in rounds]
+    if len(set(names)) != len(names):
+        raise ValueError("Two exports share a file name; rounds are keyed by it")
+
+    # Spawned rather than forked workers: the Streamlit server is threaded
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = [pool.submit(_prepare, path, survey) for _, path, survey in rounds]
+        for future in futures:
+            future.result()
+
+    datasets = {name: processed_dataset(path, survey) for name, path, survey in rounds}
+    if not combine:
+        return datasets
+    return pd.concat(datasets, names=["round", None]).reset_index(level="round")
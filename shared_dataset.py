@@ -0,0 +1,373 @@
+"""One read-only copy of each processed survey dataset per host.
+
+The processed frame of an export is written once as an uncompressed Arrow IPC
+file under ``PROCESSED_DIR``. Every Streamlit server process memory-maps that
+file and keeps one DataFrame on top of it, which all of its sessions share;
+numeric columns without missing values are zero-copy views of the mapping, so
+the operating system keeps a single copy of them for all processes.
+
+When a new version of an export only adds households (the daily re-download
+during data collection), the dataset of the previous version is extended with
+the new rows instead of being rebuilt, see ``processed_dataset``.
+
+The file holds the prepared export without its derived indicators. Those are
+computed on first request by ``with_indicators``, only as far as the requested
+columns need, and kept next to the dataset, so they too are computed once.
+
+Both files are named after the export version and a digest of everything that
+shapes them (the preprocessing code, the residence mapping), so they outlive
+server restarts and redeploys but not a change to the code. ``evict`` removes
+datasets unused for ``MAX_AGE_DAYS`` and then the least recently used ones
+above ``MAX_BYTES``.
+"""
+import functools
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import labels
+import lcs
+import preprocessing
+import survey_columns
+from ingest import CACHE_DIR, fingerprint, read_export
+from preprocessing import (DERIVED_COLUMNS, RESIDENCE_MAPPINGS, add_indicators, add_labels,
+                           clean_hhs, continue_enumerators_and_days, enumerator_counts, prepare)
+from survey_columns import SCHEMA_VERSION, export_schema, rename_map, required_columns
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_DIR = os.path.join(CACHE_DIR, "processed")
+
+# Version of the stored prepared frame (columns and their dtypes); datasets
+# of another version are neither read nor extended. 1 held the indicators,
+# 2 leaves them to with_indicators, 3 stores the labels as categoricals.
+PREPARED_VERSION = 3
+
+# Eviction limits of PROCESSED_DIR, see evict()
+MAX_AGE_DAYS = float(os.environ.get("QC_PROCESSED_MAX_AGE_DAYS", 30))
+MAX_BYTES = int(float(os.environ.get("QC_PROCESSED_MAX_MB", 4096)) * 2 ** 20)
+
+# Modules whose code decides what a dataset holds
+_CODE_MODULES = (preprocessing, labels, lcs, survey_columns)
+
+_SUFFIXES = (".indicators.arrow", ".rows.npy", ".arrow")
+
+# Schema metadata key holding DataFrame.attrs (e.g. what full_record needs)
+_ATTRS_KEY = b"qc_attrs"
+
+# A frame with one block per column is "fragmented" by design here; the
+# dashboards add their derived columns to it without needing consolidation.
+warnings.filterwarnings("ignore", message="DataFrame is highly fragmented",
+                        category=pd.errors.PerformanceWarning)
+
+# Derived indicator columns of each shared dataset, by column name
+_derived = {}
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _code_digest():
+    digest = hashlib.sha1(f"{SCHEMA_VERSION}-{PREPARED_VERSION}".encode())
+    for module in _CODE_MODULES:
+        with open(module.__file__, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=32)
+def _variant_of(mapping_items, preprocess):
+    parts = [_code_digest(), json.dumps([(str(code), label) for code, label in mapping_items])]
+    if preprocess is not None:
+        parts.append(f"{preprocess.__module__}.{preprocess.__qualname__}")
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:12]
+
+
+def _variant(residence_mapping, preprocess):
+    # Datasets of one export prepared differently are kept apart
+    return _variant_of(tuple(sorted(residence_mapping.items(), key=str)), preprocess)
+
+
+def _processed_path(fp, survey, variant):
+    return os.path.join(PROCESSED_DIR, f"{fp.key}-{survey}-{variant}.arrow")
+
+
+def _hashes_path(target):
+    # Row hashes of the raw export, indexed by row label
+    return target[:-len(".arrow")] + ".rows.npy"
+
+
+def _indicators_path(target):
+    # Derived indicator columns computed so far, indexed like the dataset
+    return target[:-len(".arrow")] + ".indicators.arrow"
+
+
+def _other_versions(fp, survey, variant):
+    # Datasets of other versions of the same export, newest first
+    prefix = fp.key.rsplit("-", 1)[0]
+    pattern = os.path.join(PROCESSED_DIR, glob.escape(prefix) + f"-*-{survey}-{variant}.arrow")
+    current = _processed_path(fp, survey, variant)
+    return sorted((p for p in glob.glob(pattern) if p != current), key=os.path.getmtime, reverse=True)
+
+
+def _remove_dataset(target):
+    _derived.pop(target, None)
+    for path in (target, _hashes_path(target), _indicators_path(target)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def evict(max_age_days=None, max_bytes=None, keep=()):
+    """Remove the datasets of ``PROCESSED_DIR`` (with their row hashes and
+    indicators) not used for ``max_age_days``, then the least recently used
+    ones until all take at most ``max_bytes``; defaults ``MAX_AGE_DAYS`` and
+    ``MAX_BYTES``. Datasets in ``keep`` stay.
+
+    Processes that still map a removed dataset keep reading it; the next
+    ``processed_dataset`` call rebuilds it.
+    """
+    max_age_days = MAX_AGE_DAYS if max_age_days is None else max_age_days
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    datasets = {}
+    for path in glob.glob(os.path.join(glob.escape(PROCESSED_DIR), "*")):
+        suffix = next((suffix for suffix in _SUFFIXES if path.endswith(suffix)), None)
+        if suffix is None:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        used, size = datasets.get(path[:-len(suffix)] + ".arrow", (0, 0))
+        datasets[path[:-len(suffix)] + ".arrow"] = (max(used, stat.st_mtime), size + stat.st_size)
+
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(size for _, size in datasets.values())
+    # Least recently used first
+    for target, (used, size) in sorted(datasets.items(), key=lambda item: item[1][0]):
+        if target in keep or (used >= cutoff and total <= max_bytes):
+            continue
+        logger.info("Evicting the processed dataset %s", os.path.basename(target))
+        _remove_dataset(target)
+        total -= size
+
+
+def _write_atomic(target, write):
+    # Same private-file-and-rename scheme as ingest._write_atomic
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_ipc(df, target):
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    metadata = {**(table.schema.metadata or {}), _ATTRS_KEY: json.dumps(df.attrs).encode()}
+    table = table.replace_schema_metadata(metadata)
+
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    _write_atomic(target, write)
+
+
+def _write_hashes(hashes, target):
+    def write(tmp_path):
+        with open(tmp_path, "wb") as hashes_file:
+            np.save(hashes_file, hashes)
+
+    _write_atomic(_hashes_path(target), write)
+
+
+@functools.lru_cache(maxsize=4)
+def _map(target):
+    table = pa.ipc.open_file(pa.memory_map(target, "r")).read_all()
+    # split_blocks keeps one block per column so pandas can wrap the mapped
+    # buffers instead of consolidating them into new arrays.
+    df = table.to_pandas(split_blocks=True)
+    attrs = json.loads(table.schema.metadata.get(_ATTRS_KEY, b"{}"))
+    if "export_columns" in attrs:
+        attrs["export_columns"] = tuple(attrs["export_columns"])
+    df.attrs.update(attrs)
+    # Lets with_indicators() find the shared dataset from any copy of it
+    df.attrs["processed_path"] = target
+    return df
+
+
+def _read_indicators(target):
+    path = _indicators_path(target)
+    if not os.path.exists(path):
+        return {}
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (pa.ArrowException, OSError) as exc:
+        logger.warning("Could not read the indicators of %s: %s", os.path.basename(target), exc)
+        return {}
+    return dict(table.to_pandas(split_blocks=True).items())
+
+
+def _shared_copy(target):
+    with _lock:
+        return _map(target).copy(deep=False)
+
+
+def row_hashes(df):
+    """Hash every row of a raw export frame.
+
+    Numbers (including numeric category codes) are hashed as float64, so the
+    same answers hash alike whichever dtype the schema fell back to.
+    """
+    values = {}
+    for column, series in df.items():
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            numeric = pd.api.types.is_numeric_dtype(series.cat.categories.dtype)
+        else:
+            numeric = pd.api.types.is_numeric_dtype(series)
+        values[column] = series.astype("float64") if numeric else series
+    return pd.util.hash_pandas_object(pd.DataFrame(values), index=False).to_numpy()
+
+
+def _occurrences(hashes):
+    # (hash, n-th occurrence) identifies a row even when households repeat
+    return pd.MultiIndex.from_arrays([hashes, pd.Series(hashes).groupby(hashes).cumcount().to_numpy()])
+
+
+def _extend(previous, raw, hashes, survey, residence_mapping):
+    # Returns the processed frame of ``raw`` built from the ``previous``
+    # version, or None when rows of that version are gone or were edited.
+    old_hashes = np.load(_hashes_path(previous))
+    new_labels = _occurrences(hashes).get_indexer(_occurrences(old_hashes))
+    if (new_labels < 0).any():
+        return None
+
+    old = _shared_copy(previous)
+    old = old.drop(columns=[column for column in DERIVED_COLUMNS if column in old.columns])
+    # Households keep their processed values but take their row label in the
+    # new export, which is what full_record() matches on.
+    old.index = pd.Index(new_labels[old.index.to_numpy()], name=old.index.name)
+
+    is_new = np.ones(len(raw), dtype=bool)
+    is_new[new_labels] = False
+    added = raw[is_new].rename(columns=rename_map(survey))
+    logger.info("Extending the processed %s dataset with %d new rows", survey, len(added))
+    if added.empty:
+        df = old
+    else:
+        added = clean_hhs(add_labels(added, survey, residence_mapping))
+        added = continue_enumerators_and_days(added, *enumerator_counts(old))
+        df = pd.concat([old, added])
+    df.attrs = dict(raw.attrs)
+    return df
+
+
+def processed_dataset(path, survey, residence_mapping=None, preprocess=None):
+    """Return the shared processed dataset of the ``survey`` export at ``path``.
+
+    ``path`` may be an ``ingest.ExportFingerprint`` instead: finding the
+    dataset then costs one ``stat`` of the export, however large it is.
+
+    The first time any process asks for this version of the export, the raw
+    export is loaded and either appended to the dataset of an earlier version
+    (when all of that version's rows are still in the export, only the new
+    rows go through the rename/mapping steps) or passed whole to
+    ``preprocess(df, residence_mapping)``, by default ``preprocessing.prepare``.
+    A custom ``preprocess`` always gets the whole export, as the steps of
+    ``prepare`` are all the appended rows would go through.
+    Derived indicators are left to ``with_indicators``.
+
+    The returned frame is a shallow copy: callers may add or replace columns,
+    which stays private to them, but the shared data itself is read-only.
+    """
+    if residence_mapping is None:
+        residence_mapping = RESIDENCE_MAPPINGS[survey]
+    fp = fingerprint(path)
+    variant = _variant(residence_mapping, preprocess)
+    target = _processed_path(fp, survey, variant)
+    if os.path.exists(target):
+        try:
+            # Marks the dataset as used for evict()
+            os.utime(target)
+        except OSError:
+            pass
+        return _shared_copy(target)
+
+    raw = read_export(path, columns=required_columns(survey), schema=export_schema(survey))
+    hashes = row_hashes(raw)
+    df = None
+    previous_versions = [p for p in _other_versions(fp, survey, variant) if os.path.exists(_hashes_path(p))]
+    # Only the built-in preprocessing is known to process rows independently
+    if previous_versions and preprocess is None:
+        df = _extend(previous_versions[0], raw, hashes, survey, residence_mapping)
+    if df is None:
+        if preprocess is None:
+            df = prepare(raw, survey, residence_mapping)
+        else:
+            df = preprocess(raw, residence_mapping)
+
+    try:
+        _write_hashes(hashes, target)
+        _write_ipc(df, target)
+    except (pa.ArrowException, TypeError, ValueError) as exc:
+        # Columns Arrow cannot represent only cost the sharing.
+        logger.warning("Could not share the processed %s dataset: %s", survey, exc)
+        return df
+
+    for old in _other_versions(fp, survey, variant):
+        _remove_dataset(old)
+    evict(keep={target})
+    return _shared_copy(target)
+
+
+def with_indicators(df, columns=None):
+    """Return ``df`` or a shallow copy of it with the derived indicator ``columns`` (default all).
+
+    For a (filtered, extended) copy of a ``processed_dataset`` the indicators
+    are computed for the whole shared dataset the first time they are asked
+    for and stored next to it; afterwards they are only looked up. Other
+    frames get them from ``preprocessing.add_indicators``.
+    """
+    columns = list(DERIVED_COLUMNS if columns is None else columns)
+    target = df.attrs.get("processed_path")
+    if target is None or not os.path.exists(target):
+        return add_indicators(df, columns)
+
+    with _lock:
+        if target not in _derived:
+            _derived[target] = _read_indicators(target)
+        derived = _derived[target]
+        missing = [column for column in columns if column not in derived]
+        if missing:
+            shared = _map(target).copy(deep=False)
+            for column, series in derived.items():
+                shared[column] = series
+            computed = add_indicators(shared, missing)
+            for column in computed.columns.difference(_map(target).columns, sort=False):
+                derived.setdefault(column, computed[column])
+            try:
+                _write_ipc(pd.DataFrame(derived), _indicators_path(target))
+            except (pa.ArrowException, TypeError, ValueError) as exc:
+                logger.warning("Could not store the indicators of %s: %s", os.path.basename(target), exc)
+        values = {column: derived[column] for column in columns if column not in df.columns}
+    if values:
+        # A new shallow copy, so filtered frames are not written through;
+        # assignment aligns on the row labels and takes their rows.
+        df = df.copy(deep=False)
+        for column, series in values.items():
+            df[column] = series
+    return df
@@ -0,0 +1,103 @@
+"""The "Filter by State" selection of the Outcome Indicators tab, cached.
+
+Supervisors switch back and forth between the same few states, so the rows of
+each selection and the label distributions charted for it are kept in a small
+LRU cache per process, keyed by dataset version and selected states.
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+# Memory budget of the cache, for the row positions and distributions together
+MAX_BYTES = int(float(os.environ.get("QC_FILTER_CACHE_MB", 64)) * 2 ** 20)
+
+
+@dataclass(frozen=True)
+class StateSelection:
+    """Rows of a state selection (None for all) and the distributions of its label columns."""
+    positions: object
+    distributions: dict
+
+    @property
+    def nbytes(self):
+        positions = 0 if self.positions is None else self.positions.nbytes
+        return positions + sum(counts.memory_usage(index=True) for counts in self.distributions.values())
+
+
+class SelectionCache:
+    """LRU cache of StateSelections within a budget of ``max_bytes``."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            selection = self._entries.get(key)
+            if selection is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return selection
+
+    def put(self, key, selection):
+        with self._lock:
+            if key in self._entries or selection.nbytes > self.max_bytes:
+                return
+            self._entries[key] = selection
+            self._bytes += selection.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def info(self):
+        """Hit and miss counts, entries and bytes held, like ``functools`` cache_info."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+_selections = SelectionCache()
+
+
+def _select(df, states, columns):
+    if states is None:
+        positions, rows = None, df
+    else:
+        positions = np.flatnonzero(df['QState'].isin(states).to_numpy())
+        rows = df.iloc[positions]
+    # Percentages, as charted
+    distributions = {column: rows[column].value_counts(normalize=True) * 100 for column in columns}
+    return StateSelection(positions, distributions)
+
+
+def filter_states(df, state_filter, columns):
+    """Return the rows of ``df`` in the states of ``state_filter`` (all of them
+    when it holds "All") and the percentage distribution of each of
+    ``columns`` among those rows.
+
+    Selections of a ``processed_dataset`` (with the same rows and columns)
+    are cached across reruns and sessions.
+    """
+    states = None if "All" in state_filter else tuple(sorted(state_filter))
+    version = df.attrs.get("processed_path")
+    if version is None:
+        selection = _select(df, states, columns)
+    else:
+        key = (version, len(df), tuple(columns), states)
+        selection = _selections.get(key)
+        if selection is None:
+            selection = _select(df, states, columns)
+            _selections.put(key, selection)
+
+    if states is not None:
+        df = df.iloc[selection.positions]
+    return df, selection.distributions
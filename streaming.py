@@ -0,0 +1,124 @@
+"""Chunked preprocessing for exports too large to load in one worker.
+
+``stream_preprocess`` runs the pipeline of ``preprocessing.prepare`` on one
+chunk of the export at a time. Only mergeable results are kept in memory
+(label counts, moments of the indicators, check hit counts); the rows a check
+of ``checks.CHECKS`` flags are written to Parquet as they are found, so peak
+memory follows the chunk size rather than the survey size.
+"""
+import os
+import shutil
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from checks import CHECKS as REGISTRY_CHECKS, add_row_columns, evaluate
+from ingest import CACHE_DIR, fingerprint, iter_export
+from preprocessing import add_indicators, add_labels, clean_hhs, continue_enumerators_and_days
+from survey_columns import export_schema, rename_map, required_columns
+
+STREAM_DIR = os.path.join(CACHE_DIR, "stream")
+
+# Category columns plotted on the Outcome Indicators tab
+LABEL_COLUMNS = ['fcs_categories_labels', 'rCSI_IPC_Label', 'rCSI_WFP_Label',
+                 'HHSCat_labels', 'HHS_IPC_labels', 'LCS_labels']
+
+# Indicators summarised with describe-style moments
+VALUE_COLUMNS = ['hh_size', 'food_con_7days_sum', 'fcs', 'rCSI', 'HHS']
+
+# Data Issues checks streamed by default: those stated in the household's own
+# answers and totals (``checks.add_row_columns``), which one chunk at a time
+# gives the same results for
+CHECKS = tuple(check for check in REGISTRY_CHECKS if check.row_wise)
+
+
+@dataclass
+class StreamSummary:
+    """Merged results of one ``stream_preprocess`` run."""
+    rows: int
+    label_counts: dict
+    moments: pd.DataFrame
+    hit_counts: dict
+    flagged_dir: str
+
+    def flagged(self, check_id):
+        """Load the rows flagged by the check ``check_id`` (all of them, so
+        mind the size)."""
+        path = os.path.join(self.flagged_dir, check_id)
+        return pd.read_parquet(path) if os.path.isdir(path) else pd.DataFrame()
+
+
+def _moments(chunk):
+    values = chunk[VALUE_COLUMNS].astype("float64")
+    return pd.DataFrame({"count": values.count(), "sum": values.sum(), "sum_sq": (values ** 2).sum(),
+                         "min": values.min(), "max": values.max()})
+
+
+def _merge_moments(total, part):
+    if total is None:
+        return part
+    return pd.DataFrame({"count": total["count"] + part["count"], "sum": total["sum"] + part["sum"],
+                         "sum_sq": total["sum_sq"] + part["sum_sq"],
+                         "min": np.fmin(total["min"], part["min"]), "max": np.fmax(total["max"], part["max"])})
+
+
+def _describe(moments):
+    count = moments["count"]
+    mean = moments["sum"] / count
+    # Sample standard deviation, as DataFrame.describe reports it
+    var = (moments["sum_sq"] - count * mean ** 2) / (count - 1)
+    return pd.DataFrame({"count": count, "mean": mean, "std": np.sqrt(var.clip(lower=0)),
+                         "min": moments["min"], "max": moments["max"]})
+
+
+def stream_preprocess(path, survey, residence_mapping, chunksize=100_000, checks=None):
+    """Preprocess the ``survey`` export at ``path`` chunk by chunk.
+
+    Returns a StreamSummary; label counts are per state, and the rows flagged
+    by each of ``checks`` (``checks.Check``s stated in row-wise columns,
+    default ``CHECKS``) are written under ``STREAM_DIR`` as one Parquet part
+    per chunk.
+    """
+    checks = CHECKS if checks is None else tuple(checks)
+    flagged_dir = os.path.join(STREAM_DIR, fingerprint(path).key + "-" + survey)
+    shutil.rmtree(flagged_dir, ignore_errors=True)
+
+    rows = 0
+    label_counts = {}
+    moments = None
+    hit_counts = dict.fromkeys((check.id for check in checks), 0)
+    rows_per_state, rows_per_enumerator = Counter(), Counter()
+
+    chunks = iter_export(path, columns=required_columns(survey), schema=export_schema(survey),
+                         chunksize=chunksize)
+    for part, chunk in enumerate(chunks):
+        chunk = chunk.rename(columns=rename_map(survey))
+        chunk = clean_hhs(add_labels(chunk, survey, residence_mapping))
+        chunk = continue_enumerators_and_days(chunk, rows_per_state, rows_per_enumerator)
+        chunk = add_indicators(chunk)
+
+        rows += len(chunk)
+        for column in LABEL_COLUMNS:
+            counts = chunk[['QState', column]].value_counts()
+            # Categorical columns also list the combinations that do not occur
+            counts = counts[counts > 0]
+            if column in label_counts:
+                counts = label_counts[column].add(counts, fill_value=0).astype("int64")
+            label_counts[column] = counts
+        moments = _merge_moments(moments, _moments(chunk))
+
+        add_row_columns(chunk, survey)
+        flags = evaluate(chunk, checks)
+        for check in checks:
+            hits = chunk[flags.column(check.id)]
+            if hits.empty:
+                continue
+            hit_counts[check.id] += len(hits)
+            check_dir = os.path.join(flagged_dir, check.id)
+            os.makedirs(check_dir, exist_ok=True)
+            hits.to_parquet(os.path.join(check_dir, f"part-{part:05d}.parquet"))
+
+    moments = _describe(moments) if moments is not None else pd.DataFrame()
+    return StreamSummary(rows, label_counts, moments, hit_counts, flagged_dir)
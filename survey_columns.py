@@ -0,0 +1,169 @@
+"""Column definitions shared by the CFSA and FSMS dashboards.
+
+The rename maps and column lists used by the preprocessing and the Data Issues
+checks live here so the loader can work out, from the same definitions, which
+export columns are needed at all and how narrowly each one can be stored.
+"""
+from dataclasses import dataclass
+
+SURVEYS = ("cfsa", "fsms")
+
+# Household size is asked in a different section of each questionnaire
+HH_SIZE_COLUMN = {"cfsa": "Q2_7", "fsms": "Q2_4"}
+
+# The CFSA export names the respondent's gender Q2_2 in some rounds and Q2_2a in others
+GENDER_COLUMNS = {"cfsa": ["Q2_2", "Q2_2a"], "fsms": ["Q2_2a"]}
+
+RESIDENCE_COLUMN = "Q2_1"
+
+# Enumerator ID, under the names the export tools use for it; the first one
+# present is used
+ENUMERATOR_ID_COLUMNS = ["EnumeratorID", "Enumerator_ID", "enumerator", "username"]
+
+RENAME_COLUMNS = {"QState": "QState_orig",
+                  "Q6_2_1": "Lcs_stress_DomAsset",
+                  "Q6_2_2": "Lcs_crisis_Health",
+                  "Q6_2_3": "Lcs_crisis_con_stock",
+                  "Q6_2_4": "Lcs_stress_Saving",
+                  "Q6_2_5": "Lcs_stress_accum_debt",
+                  "Q6_2_6": "Lcs_em_ResAsset",
+                  "Q6_2_7": "Lcs_stress_red_farm_liv_input",
+                  "Q6_2_8": "Lcs_em_last_female",
+                  "Q6_2_9": "Lcs_em_Begged",
+                  "Q6_2_10": "Lcs_crisis_wild_food",
+                  "Q3_1_1": "liv_activ_crops",
+                  "Q3_1_2": "liv_activ_livestock",
+                  "Q3_1_3": "liv_activ_donation_gift",
+                  "Q3_1_4": "liv_activ_business",
+                  "Q3_1_5": "liv_activ_agric_wage_labour",
+                  "Q3_1_6": "liv_activ_non_agric_wage_labour",
+                  "Q3_1_7": "liv_activ_sale _aid_Food",
+                  "Q3_1_8": "liv_activ_sale_firewood_charcoal",
+                  "Q3_1_9": "liv_activ_traditional_mining",
+                  "Q3_1_10": "liv_activ_salaried_work",
+                  "Q3_1_11": "liv_activ_begging",
+                  "Q3_1_12": "liv_activ_remittances",
+                  "Q3_1_13": "liv_activ_pension",
+                  "Q7_2_1": "Q7_2_1_HH_own_cattle",
+                  "Q7_2_2": "Q7_2_2_HH_own_donkey",
+                  "Q7_2_3": "Q7_2_3_HH_own_camel",
+                  "Q7_2_4": "Q7_2_4_HH_own_goats_sheep",
+                  "Q7_2_5": "Q7_2_5_HH_own_poultry",
+                  "Q6_6": "Q6_6_HHSNoFood",
+                  "Q6_7": "Q6_7_HHSNoFood_FR",
+                  "Q6_8": "Q6_8_HHSBedHung",
+                  "Q6_9": "Q6_9_HHSBedHung_FR",
+                  "Q6_10": "Q6_10_HHSNotEat",
+                  "Q6_11": "Q6_11_HHSNotEat_FR"
+                  }
+
+
+def rename_map(survey):
+    """Export-to-analysis column names for ``survey``."""
+    return {**RENAME_COLUMNS, HH_SIZE_COLUMN[survey]: "hh_size"}
+
+
+def _renamed_from(prefix):
+    return [raw for raw, name in RENAME_COLUMNS.items() if name.startswith(prefix)]
+
+
+# Food groups in questionnaire order: a = days eaten in the last 7 days,
+# b = main source, c = eaten in the last 24 hours
+FOOD_GROUPS = ["Q5_1", "Q5_2", "Q5_3", "Q5_4", "Q5_4_1", "Q5_4_2", "Q5_4_3", "Q5_4_4",
+               "Q5_5", "Q5_5_1", "Q5_5_2", "Q5_6", "Q5_6_1", "Q5_7", "Q5_8", "Q5_9"]
+
+FOOD_CON_7DAYS_COLUMNS = [group + "a" for group in FOOD_GROUPS]
+FOOD_SOURCE_COLUMNS = [group + "b" for group in FOOD_GROUPS]
+FOOD_CON_24HRS_COLUMNS = [group + "c" for group in FOOD_GROUPS]
+
+# The nine FCS food groups (the sub-groups Q5_4_1 ... are not weighted)
+FCS_COLUMNS = ["Q5_1a", "Q5_2a", "Q5_3a", "Q5_4a", "Q5_5a", "Q5_6a", "Q5_7a", "Q5_8a", "Q5_9a"]
+
+RCSI_COLUMNS = ["Q6_1_1", "Q6_1_2", "Q6_1_3", "Q6_1_4", "Q6_1_5"]
+
+EXPENDITURE_FOOD_ITEMS_COLUMNS = ["Q4_1a", "Q4_1b", "Q4_1c", "Q4_2a", "Q4_2b", "Q4_2c",
+                                  "Q4_3a", "Q4_3b", "Q4_3c", "Q4_4a", "Q4_4b", "Q4_4c",
+                                  "Q4_5a", "Q4_5b", "Q4_5c", "Q4_6a", "Q4_6b", "Q4_6c",
+                                  "Q4_7a", "Q4_7b", "Q4_7c", "Q4_8a", "Q4_8b", "Q4_8c",
+                                  "Q4_9a", "Q4_9b", "Q4_9c", "Q4_10a", "Q4_10b", "Q4_10c"]
+
+EXPENDITURE_EDUCATION_COLUMNS = ["Q4_14a", "Q4_14b"]
+
+CHILDREN_24MONTHS_17_YEARS_COLUMNS = {
+    "cfsa": ['Q2_7_2a', 'Q2_7_2b', 'Q2_7_3a', 'Q2_7_3b', 'Q2_7_4a', 'Q2_7_4b'],
+    "fsms": ['Q2_4_2a', 'Q2_4_2b', 'Q2_4_3a', 'Q2_4_3b', 'Q2_4_4a', 'Q2_4_4b'],
+}
+
+LCS_COLUMNS = _renamed_from("Lcs_")
+HHS_COLUMNS = _renamed_from("Q6_")
+LIVELIHOOD_COLUMNS = _renamed_from("liv_activ_")
+LIVESTOCK_COLUMNS = _renamed_from("Q7_2_")
+
+
+def column_manifest(survey):
+    """Export columns read by each indicator and group of Data Issues checks."""
+    hh_size = [HH_SIZE_COLUMN[survey]]
+    return {
+        # Preprocessing
+        "state": ["QState"],
+        "residence": [RESIDENCE_COLUMN],
+        "gender": GENDER_COLUMNS[survey],
+        "hh_size": hh_size,
+        "fcs": FOOD_CON_7DAYS_COLUMNS,
+        "rcsi": RCSI_COLUMNS,
+        "hhs": HHS_COLUMNS,
+        "lcs": LCS_COLUMNS,
+        "livelihoods": LIVELIHOOD_COLUMNS,
+        "livestock": LIVESTOCK_COLUMNS,
+        "enumerator": ENUMERATOR_ID_COLUMNS,
+        # Data Issues checks
+        "zero_food_spending": EXPENDITURE_FOOD_ITEMS_COLUMNS,                          # 1
+        "education_without_children": (EXPENDITURE_EDUCATION_COLUMNS
+                                        + CHILDREN_24MONTHS_17_YEARS_COLUMNS[survey]),  # 2
+        "income_total": LIVELIHOOD_COLUMNS,                                            # 3
+        "food_consumption": FOOD_CON_7DAYS_COLUMNS + FOOD_CON_24HRS_COLUMNS,           # 4-37, 50-51
+        "food_expenditure": EXPENDITURE_FOOD_ITEMS_COLUMNS + hh_size + ["QState"],    # 38-49, 52
+        "zero_spending_sources": FOOD_SOURCE_COLUMNS + LIVELIHOOD_COLUMNS,             # tables after 52
+        "hhs_consistency": HHS_COLUMNS,                                                # 53-55
+    }
+
+
+def required_columns(survey):
+    """Union of the manifest, in first-use order."""
+    columns = []
+    for group in column_manifest(survey).values():
+        columns.extend(column for column in group if column not in columns)
+    return columns
+
+
+# Bump whenever a dtype below changes so cached conversions are rebuilt
+SCHEMA_VERSION = 3
+
+
+@dataclass(frozen=True, eq=False)
+class ExportSchema:
+    """Storage dtype of every known export column of one survey."""
+    survey: str
+    version: int
+    dtypes: dict
+
+
+def export_schema(survey):
+    """Return the ExportSchema applied when loading ``survey`` exports.
+
+    Answer codes and day counts fit in int8; the FCS and rCSI inputs are
+    weighted (up to x4) before they are summed, so they get int16 to keep
+    out-of-range codes from wrapping around. Amounts stay float64, so the
+    values supervisors back-check are exactly the ones in the export.
+    """
+    dtypes = {"QState": "int8", RESIDENCE_COLUMN: "category", HH_SIZE_COLUMN[survey]: "int8"}
+    dtypes.update({column: "category" for column in GENDER_COLUMNS[survey] + ENUMERATOR_ID_COLUMNS})
+    dtypes.update({column: "int8" for column in CHILDREN_24MONTHS_17_YEARS_COLUMNS[survey]})
+    dtypes.update({column: "int8" for column in LIVELIHOOD_COLUMNS})
+    dtypes.update({column: "float64" for column in EXPENDITURE_FOOD_ITEMS_COLUMNS + EXPENDITURE_EDUCATION_COLUMNS})
+    dtypes.update({column: "int8" for column in FOOD_CON_7DAYS_COLUMNS + FOOD_SOURCE_COLUMNS
+                   + FOOD_CON_24HRS_COLUMNS})
+    dtypes.update({column: "int16" for column in FCS_COLUMNS + RCSI_COLUMNS})
+    dtypes.update({column: "int8" for column in LCS_COLUMNS + HHS_COLUMNS})
+    dtypes.update({column: "int16" for column in LIVESTOCK_COLUMNS})
+    return ExportSchema(survey, SCHEMA_VERSION, dtypes)